@@ -0,0 +1,208 @@
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+
+import msgpack
+
+# Pub/sub layer under ConnectionManager so room traffic reaches sockets held by
+# other uvicorn workers. Each worker delivers to its own sockets directly and
+# publishes the envelope; the backplane hands it to every *other* worker.
+# Envelopes may carry raw msgpack frames, so the socket framing is msgpack too.
+# `peers` is how many other workers are listening; with none, nothing is published.
+BACKPLANE = os.getenv("ONEVOICE_BACKPLANE", "memory")
+BACKPLANE_PATH = os.getenv("ONEVOICE_BACKPLANE_PATH", "/tmp/onevoice-backplane.sock")
+MAX_BUFFERED_BYTES = 8 * 1024 * 1024
+RECONNECT_DELAY = 0.5
+
+_header = struct.Struct(">I")
+
+
+class InMemoryBackplane:
+    """Relays envelopes between managers that share a hub in this process."""
+
+    def __init__(self, hub: list | None = None):
+        self.hub = hub if hub is not None else []
+        self._on_message = None
+        self.stats = {"published": 0, "dropped": 0}
+
+    @property
+    def peers(self) -> int:
+        return sum(1 for peer in self.hub if peer is not self and peer._on_message)
+
+    async def start(self, on_message):
+        self._on_message = on_message
+        self.hub.append(self)
+
+    async def stop(self):
+        if self in self.hub:
+            self.hub.remove(self)
+
+    def publish(self, envelope: dict):
+        self.stats["published"] += 1
+        for peer in self.hub:
+            if peer is not self and peer._on_message:
+                peer._on_message(envelope)
+
+
+class UnixSocketBroker:
+    """Fans frames out to every connected worker except the one that sent them."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.clients: set[asyncio.StreamWriter] = set()
+        self.server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+
+    def _announce(self):
+        # Tell every worker how many others are connected, so a lone one skips publishing
+        for client in list(self.clients):
+            if not client.is_closing():
+                client.write(_pack({"peers": len(self.clients) - 1}))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
+        self._announce()
+        try:
+            while True:
+                header = await reader.readexactly(_header.size)
+                body = await reader.readexactly(_header.unpack(header)[0])
+                frame = header + body
+                for client in list(self.clients):
+                    if client is writer:
+                        continue
+                    if client.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+                        logging.warning("Backplane broker dropping a worker that stopped reading")
+                        self.clients.discard(client)
+                        client.close()
+                        continue
+                    client.write(frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+            self._announce()
+
+
+class UnixSocketBackplane:
+    """
+    Workers talk through a broker on a local Unix socket. Whichever worker holds
+    the lock file hosts the broker; the rest connect to it, and take over the
+    election if that worker goes away.
+    """
+
+    def __init__(self, path: str = BACKPLANE_PATH):
+        self.path = path
+        self.broker: UnixSocketBroker | None = None
+        self._lock_file = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task = None
+        self._on_message = None
+        self._stopping = False
+        # Other workers on the broker, as last announced by it
+        self.peers = 0
+        # Frames dropped because the broker stopped reading, like a full socket outbox
+        self.stats = {"published": 0, "dropped": 0}
+        self._backlogged = False
+
+    async def start(self, on_message):
+        self._on_message = on_message
+        await self._connect()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def stop(self):
+        self._stopping = True
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+        if self.broker:
+            await self.broker.stop()
+        if self._lock_file:
+            self._lock_file.close()
+
+    def publish(self, envelope: dict):
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            logging.warning("Backplane not connected; message delivered to this worker only")
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+            self.stats["dropped"] += 1
+            if not self._backlogged:
+                self._backlogged = True
+                logging.warning("Backplane broker is not reading; dropping messages to other workers")
+            return
+        self._backlogged = False
+        writer.write(_pack(envelope))
+        self.stats["published"] += 1
+
+    async def _elect(self):
+        if self.broker:
+            return
+        lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        self._lock_file = lock_file
+        self.broker = UnixSocketBroker(self.path)
+        await self.broker.start()
+        logging.info(f"Backplane broker listening on {self.path} (pid {os.getpid()})")
+
+    async def _connect(self):
+        while True:
+            await self._elect()
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _read_loop(self):
+        while not self._stopping:
+            try:
+                header = await self._reader.readexactly(_header.size)
+                body = await self._reader.readexactly(_header.unpack(header)[0])
+            except (asyncio.IncompleteReadError, ConnectionError):
+                if self._stopping:
+                    return
+                logging.warning("Lost backplane broker connection; reconnecting")
+                self._writer = None
+                self.peers = 0
+                await self._connect()
+                continue
+            try:
+                envelope = msgpack.unpackb(body, raw=False)
+                if "peers" in envelope:
+                    self.peers = envelope["peers"]
+                    continue
+                self._on_message(envelope)
+            except Exception:
+                logging.exception("Failed to deliver backplane message")
+
+
+def _pack(envelope: dict) -> bytes:
+    body = msgpack.packb(envelope, use_bin_type=True)
+    return _header.pack(len(body)) + body
+
+
+def create_backplane():
+    if BACKPLANE == "unix":
+        return UnixSocketBackplane()
+    if BACKPLANE == "memory":
+        return InMemoryBackplane()
+    raise ValueError(f"Unknown ONEVOICE_BACKPLANE backend: {BACKPLANE!r}")
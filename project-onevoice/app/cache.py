@@ -0,0 +1,61 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._pending: dict = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.stats["misses"] += 1
+            return default
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.stats["misses"] += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_load(self, key, loader):
+        """
+        Returns the cached value or awaits `loader()` to fill it. Concurrent
+        misses on the same key share one load. `None` results are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(loader())
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        value = await asyncio.shield(pending)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+
+from . import crud, database
+from .cache import TTLCache
+from .database import UNAVAILABLE_ERRORS
+from .signaling import manager
+from .wire import Frame
+
+# Chat from the REST endpoint and from the signaling socket goes through one
+# pipeline: it is fanned out to the room immediately and persisted by a
+# write-behind buffer that flushes one multi-row INSERT per batch.
+CHAT_FLUSH_SIZE = int(os.getenv("ONEVOICE_CHAT_FLUSH_SIZE", "200"))
+CHAT_FLUSH_INTERVAL_MS = float(os.getenv("ONEVOICE_CHAT_FLUSH_INTERVAL_MS", "50"))
+# Messages the buffer may hold, e.g. through a database outage; beyond that new
+# chat is refused with ChatBufferFull (503 with Retry-After) instead of growing memory
+CHAT_BUFFER_LIMIT = int(os.getenv("ONEVOICE_CHAT_BUFFER_LIMIT", "10000"))
+CHAT_RETRY_AFTER = int(os.getenv("ONEVOICE_CHAT_RETRY_AFTER", "5"))
+LIVE_SESSION_TTL_SECONDS = 5
+
+
+def _resolve(waiters: list, error: Exception | None):
+    for waiter in waiters:
+        if waiter is None or waiter.done():
+            continue
+        if error is None:
+            waiter.set_result(None)
+        else:
+            waiter.set_exception(error)
+
+
+class ChatBufferFull(Exception):
+    """Raised when the write-behind buffer already holds CHAT_BUFFER_LIMIT messages."""
+
+
+class ChatWriter:
+    def __init__(self, flush_size: int = CHAT_FLUSH_SIZE, flush_interval_ms: float = CHAT_FLUSH_INTERVAL_MS,
+                 buffer_limit: int = CHAT_BUFFER_LIMIT):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.buffer_limit = buffer_limit
+        self._rows: list[dict] = []
+        self._waiters: list[asyncio.Future | None] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task = None
+        self._stopping = False
+        self._unavailable = False
+        self.stats = {"messages": 0, "batches": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # The loop drains the buffer and exits; cancelling it could cut an insert short
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        else:
+            await self.flush()
+        if self._rows:
+            logging.error(f"{len(self._rows)} chat messages were not persisted before shutdown")
+            self.stats["failed"] += len(self._rows)
+            _resolve(self._waiters, RuntimeError("Chat writer stopped before the message was stored"))
+            self._rows, self._waiters = [], []
+
+    def submit(self, row: dict, durable: bool = False) -> asyncio.Future | None:
+        """
+        Queues one chat_messages row. With durable=True, returns a future that
+        resolves once it is committed. Raises ChatBufferFull when the buffer is full.
+        """
+        if len(self._rows) >= self.buffer_limit:
+            self.stats["rejected"] += 1
+            raise ChatBufferFull()
+        waiter = asyncio.get_running_loop().create_future() if durable else None
+        self._rows.append(row)
+        self._waiters.append(waiter)
+        if len(self._rows) >= self.flush_size and self._wakeup:
+            self._wakeup.set()
+        return waiter
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        # Whatever was submitted while the last flush ran
+        await self.flush()
+
+    def _requeue(self, rows: list[dict], waiters: list):
+        self._rows[:0] = rows
+        self._waiters[:0] = waiters
+
+    async def flush(self):
+        """
+        Writes out the buffer in batches. Rows stay queued while the database is
+        unavailable; a batch that fails otherwise is retried row by row, so only
+        the rows that cannot be stored are dropped.
+        """
+        while self._rows:
+            rows, self._rows = self._rows[:self.flush_size], self._rows[self.flush_size:]
+            waiters, self._waiters = self._waiters[:self.flush_size], self._waiters[self.flush_size:]
+            try:
+                await _insert_rows(rows)
+            except asyncio.CancelledError:
+                self._requeue(rows, waiters)
+                raise
+            except UNAVAILABLE_ERRORS:
+                self._requeue(rows, waiters)
+                self._report_unavailable()
+                return
+            except Exception:
+                logging.warning(f"Failed to persist a batch of {len(rows)} chat messages; retrying one by one", exc_info=True)
+                if not await self._insert_one_by_one(rows, waiters):
+                    return
+                continue
+            if self._unavailable:
+                logging.warning("Database reachable again; writing queued chat messages")
+                self._unavailable = False
+            self.stats["messages"] += len(rows)
+            self.stats["batches"] += 1
+            _resolve(waiters, None)
+
+    def _report_unavailable(self):
+        # Once per outage; the loop retries every flush interval meanwhile
+        if not self._unavailable:
+            logging.exception(f"Database unavailable; {len(self._rows)} chat messages stay queued")
+            self._unavailable = True
+
+    async def _insert_one_by_one(self, rows: list[dict], waiters: list) -> bool:
+        # False when the database is unavailable; the rest of the rows are queued again
+        for i, (row, waiter) in enumerate(zip(rows, waiters)):
+            try:
+                await _insert_rows([row])
+            except asyncio.CancelledError:
+                self._requeue(rows[i:], waiters[i:])
+                raise
+            except UNAVAILABLE_ERRORS:
+                self._requeue(rows[i:], waiters[i:])
+                self._report_unavailable()
+                return False
+            except Exception as error:
+                logging.exception(f"Dropping chat message {row['id']}, which cannot be stored")
+                self.stats["failed"] += 1
+                _resolve([waiter], error)
+            else:
+                self._unavailable = False
+                self.stats["messages"] += 1
+                _resolve([waiter], None)
+        return True
+
+
+async def _insert_rows(rows: list[dict]):
+    async with database.AsyncSessionLocal() as db:
+        await crud.insert_chat_messages(db, rows)
+
+
+async def _live_session_id(room_id: uuid.UUID):
+    async with database.AsyncSessionLocal() as db:
+        session = await crud.get_live_session_for_room(db, room_id=room_id)
+        return session.id if session else None
+
+
+chat_writer = ChatWriter()
+live_sessions = TTLCache(maxsize=10_000, ttl=LIVE_SESSION_TTL_SECONDS)
+
+
+async def live_session_for_room(room_id: str):
+    room_uuid = uuid.UUID(room_id)
+    return await live_sessions.get_or_load(room_uuid, lambda: _live_session_id(room_uuid))
+
+
+def publish_chat(session_id: uuid.UUID, room_id: str, user, content: str, sender=None, durable: bool = False):
+    """
+    Fans a chat message out to the room right away and hands it to the
+    write-behind buffer. Returns the stored row and, when `durable` is set,
+    a future that resolves once it is committed. Raises ChatBufferFull, before
+    anything is sent, when the buffer cannot take it.
+    """
+    message = {
+        "id": uuid.uuid4(),
+        "session_id": session_id,
+        "user_id": user.id,
+        "content": content,
+        "created_at": datetime.now(timezone.utc),
+    }
+    waiter = chat_writer.submit(message, durable=durable)
+    manager.publish(Frame(payload={
+        "type": "chat-message",
+        "id": str(message["id"]),
+        "session_id": str(session_id),
+        "sender_id": str(user.id),
+        "full_name": user.full_name,
+        "text": content,
+        "created_at": message["created_at"].isoformat(),
+    }), room_id, sender)
+    return message, waiter
+
+
+async def send_chat(session_id: uuid.UUID, room_id: str, user, content: str, durable: bool = False) -> dict:
+    message, waiter = publish_chat(session_id, room_id, user, content, durable=durable)
+    if waiter is not None:
+        await waiter
+    return message
@@ -1,278 +1,420 @@
-from sqlalchemy.orm import Session
-from . import models, schemas, security
+from sqlalchemy import case, cast, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from . import models, schemas
+from .database import unit_of_work
 import uuid
 import shortuuid
 from datetime import datetime,timezone
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
-
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = security.hash_password(user.password)
-    db_user = models.User(
-        email=user.email,
-        full_name=user.full_name,
-        password_hash=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, password_hash: str):
+    async with unit_of_work(db):
+        db_user = models.User(
+            email=user.email,
+            full_name=user.full_name,
+            password_hash=password_hash
+        )
+        db.add(db_user)
     return db_user
 
-def create_room_for_user(db: Session, room: schemas.RoomCreate, user_id: uuid.UUID):
+async def create_room_for_user(db: AsyncSession, room: schemas.RoomCreate, user_id: uuid.UUID):
     unique_code = shortuuid.random(length=8)
-    db_room = models.Room(
-        name=room.name,
-        is_private=room.is_private,
-        owner_id=user_id,
-        unique_code=unique_code
-    )
-    db.add(db_room)
-    db.commit()
-    db.refresh(db_room)
+    async with unit_of_work(db):
+        db_room = models.Room(
+            id=uuid.uuid4(), # set up front so a session can reference it in the same flush
+            name=room.name,
+            is_private=room.is_private,
+            owner_id=user_id,
+            unique_code=unique_code
+        )
+        db.add(db_room)
     return db_room
 
-def get_room_by_id(db: Session, room_id: uuid.UUID):
-    return db.query(models.Room).filter(models.Room.id == room_id).first()
+async def get_room_by_id(db: AsyncSession, room_id: uuid.UUID):
+    result = await db.execute(select(models.Room).filter(models.Room.id == room_id))
+    return result.scalars().first()
 
-def get_rooms_for_user(db: Session, user_id: uuid.UUID):
-    return db.query(models.Room).filter(models.Room.owner_id == user_id).all()
+async def get_rooms_for_user(db: AsyncSession, user_id: uuid.UUID):
+    result = await db.execute(select(models.Room).filter(models.Room.owner_id == user_id))
+    return result.scalars().all()
 
-def delete_room(db: Session, room: models.Room):
-    db.delete(room)
-    db.commit()
-    
-
-def start_session_in_room(db: Session, room_id: uuid.UUID, user_id: uuid.UUID):
-    # Create the session
-    db_session = models.Session(
-        room_id=room_id,
-        status='LIVE',
-        actual_start_time=datetime.now(timezone.utc) # <-- 2. Correctly use timezone.utc
-    )
-    db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+async def update_room(db: AsyncSession, room: models.Room, fields: dict):
+    # updated_at comes back through RETURNING (eager_defaults), so no refresh
+    async with unit_of_work(db):
+        for key, value in fields.items():
+            setattr(room, key, value)
+    return room
 
-    # Automatically add the host as the first participant
-    host_participant = models.SessionParticipant(
-        session_id=db_session.id,
-        user_id=user_id,
-        role='HOST'
-    )
-    db.add(host_participant)
-    db.commit()
-    
-    return db_session
+async def delete_room(db: AsyncSession, room: models.Room):
+    async with unit_of_work(db):
+        await db.delete(room)
 
-def add_participant_to_session(db: Session, session_id: uuid.UUID, user_id: uuid.UUID):
-    # Check if user is already in the session
-    db_participant = db.query(models.SessionParticipant).filter(
-        models.SessionParticipant.session_id == session_id,
-        models.SessionParticipant.user_id == user_id
-    ).first()
 
-    if db_participant:
-        return db_participant # Or handle re-joining logic
+def _add_session_with_host(db: AsyncSession, user_id: uuid.UUID, **fields):
+    # The host row hangs off the relationship, so one flush inserts both in order
+    db_session = models.Session(**fields)
+    db.add(db_session)
+    db.add(models.SessionParticipant(session=db_session, user_id=user_id, role='HOST'))
+    return db_session
 
-    # ✅ Check if this is the first participant (should be HOST)
-    existing_participants = db.query(models.SessionParticipant).filter(
-        models.SessionParticipant.session_id == session_id,
-        models.SessionParticipant.leave_time.is_(None)  # Only active participants
-    ).count()
-    
-    # ✅ First participant becomes HOST, others become PARTICIPANT
-    role = 'HOST' if existing_participants == 0 else 'PARTICIPANT'
+async def start_session_in_room(db: AsyncSession, room_id: uuid.UUID, user_id: uuid.UUID):
+    # Create the session and automatically add the host as the first participant
+    async with unit_of_work(db):
+        db_session = _add_session_with_host(
+            db, user_id,
+            room_id=room_id,
+            status='LIVE',
+            actual_start_time=datetime.now(timezone.utc) # <-- 2. Correctly use timezone.utc
+        )
+    return db_session
 
-    new_participant = models.SessionParticipant(
+def _upsert(db: AsyncSession, model):
+    # INSERT ... ON CONFLICT is dialect-specific; both dialects share the API
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return postgresql_insert(model)
+
+async def next_roster_seq(db: AsyncSession, session_id: uuid.UUID, count: int = 1) -> int:
+    """
+    Reserves `count` roster sequence numbers for the session and returns the
+    last one. Call it inside the change's unit of work: the UPDATE locks the
+    session row until commit, so every worker hands out numbers in commit order.
+    """
+    return (await db.execute(
+        update(models.Session).
+        filter(models.Session.id == session_id).
+        # updated_at is left alone; a roster change is not a change to the session
+        values(roster_seq=models.Session.roster_seq + count, updated_at=models.Session.updated_at).
+        returning(models.Session.roster_seq).
+        execution_options(synchronize_session=False)
+    )).scalar_one()
+
+async def add_participant_to_session(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID):
+    """
+    Joins (or rejoins) a session with one INSERT ... ON CONFLICT and returns
+    (participant, roster seq). The role is decided inside the INSERT: HOST if
+    nobody is active in the session, else PARTICIPANT. If the user already has a
+    row, it keeps its role and only leave_time is cleared, so repeated or
+    concurrent joins by the same user are harmless.
+
+    The roster seq is reserved first, in its own statement, which locks the
+    session row, so concurrent first joiners take turns: under READ COMMITTED
+    each statement gets a fresh snapshot, so the INSERT after the lock sees the
+    HOST row the previous joiner committed.
+    """
+    participants = models.SessionParticipant
+    someone_active = select(participants.user_id).filter(
+        participants.session_id == session_id,
+        participants.leave_time.is_(None)
+    ).exists()
+    role = select(cast(
+        case((someone_active, 'PARTICIPANT'), else_='HOST'), participants.__table__.c.role.type
+    )).scalar_subquery()
+
+    statement = _upsert(db, participants).values(
         session_id=session_id,
         user_id=user_id,
-        role=role
+        role=role,
+        is_sharing_screen=False
     )
-    db.add(new_participant)
-    db.commit()
-    db.refresh(new_participant)
-    return new_participant
+    statement = statement.on_conflict_do_update(
+        index_elements=[participants.session_id, participants.user_id],
+        set_={"leave_time": None}
+    ).returning(participants).execution_options(populate_existing=True)
 
+    async with unit_of_work(db):
+        seq = await next_roster_seq(db, session_id)
+        participant = (await db.execute(statement)).scalars().one()
+    return participant, seq
 
-def get_session_by_id(db: Session, session_id: uuid.UUID):
-    return db.query(models.Session).filter(models.Session.id == session_id).first()
 
-def get_participants_in_session(db: Session, session_id: uuid.UUID):
-    return db.query(models.SessionParticipant).filter(models.SessionParticipant.session_id == session_id).all()
+async def get_session_by_id(db: AsyncSession, session_id: uuid.UUID):
+    result = await db.execute(select(models.Session).filter(models.Session.id == session_id))
+    return result.scalars().first()
 
-def get_participant(db: Session, session_id: uuid.UUID, user_id: uuid.UUID):
-    return db.query(models.SessionParticipant).filter(
+async def get_active_participants(db: AsyncSession, session_id: uuid.UUID):
+    # One query: departed participants are filtered in SQL and users are joined in,
+    # so the cost of a roster read does not grow with the number of participants
+    result = await db.execute(select(models.SessionParticipant).options(joinedload(models.SessionParticipant.user)).filter(
         models.SessionParticipant.session_id == session_id,
-        models.SessionParticipant.user_id == user_id
-    ).first()
+        models.SessionParticipant.leave_time.is_(None)
+    ).order_by(models.SessionParticipant.join_time))
+    return result.scalars().all()
 
-def remove_participant_from_session(db: Session, session_id: uuid.UUID, user_id: uuid.UUID):
-    participant = get_participant(db, session_id, user_id)
-    if participant:
+async def get_participant(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID):
+    result = await db.execute(select(models.SessionParticipant).filter(
+        models.SessionParticipant.session_id == session_id,
+        models.SessionParticipant.user_id == user_id
+    ))
+    return result.scalars().first()
+
+async def remove_participant_from_session(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID):
+    participant = await get_participant(db, session_id, user_id)
+    if participant is None:
+        return None, None
+    async with unit_of_work(db):
+        seq = await next_roster_seq(db, session_id)
         participant.leave_time = datetime.now(timezone.utc)
-        db.add(participant)
-        db.commit()
-    return participant
-
-def end_session(db: Session, session: models.Session):
-    session.status = 'ENDED'
-    session.actual_end_time = datetime.now(timezone.utc)
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    return session
-
+    return participant, seq
 
-def schedule_session_in_room(db: Session, room_id: uuid.UUID, user_id: uuid.UUID, start_time: datetime):
-    db_session = models.Session(
-        room_id=room_id,
-        status='SCHEDULED',
-        scheduled_start_time=start_time
-    )
-    db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+async def end_session(db: AsyncSession, session: models.Session):
+    async with unit_of_work(db):
+        session.status = 'ENDED'
+        session.actual_end_time = datetime.now(timezone.utc)
+    return session
 
-    # Add the user who scheduled the session as the HOST
-    host_participant = models.SessionParticipant(
-        session_id=db_session.id,
-        user_id=user_id,
-        role='HOST'
-    )
-    db.add(host_participant)
-    db.commit()
 
+async def schedule_session_in_room(db: AsyncSession, room_id: uuid.UUID, user_id: uuid.UUID, start_time: datetime):
+    # The user who scheduled the session is its HOST
+    async with unit_of_work(db):
+        db_session = _add_session_with_host(
+            db, user_id,
+            room_id=room_id,
+            status='SCHEDULED',
+            scheduled_start_time=start_time
+        )
     return db_session
 
 
-def cancel_session(db: Session, session: models.Session):
-    session.status = 'CANCELLED'
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+async def cancel_session(db: AsyncSession, session: models.Session):
+    async with unit_of_work(db):
+        session.status = 'CANCELLED'
     return session
 
 
 
-def get_sessions_for_room(db: Session, room_id: uuid.UUID):
-    return db.query(models.Session).filter(models.Session.room_id == room_id).order_by(models.Session.created_at.desc()).all()
+async def get_sessions_for_room(db: AsyncSession, room_id: uuid.UUID):
+    result = await db.execute(select(models.Session).filter(models.Session.room_id == room_id).order_by(models.Session.created_at.desc()))
+    return result.scalars().all()
 
 
 # In app/crud.py
 
-def start_screen_share(db: Session, session_id: uuid.UUID, user_id: uuid.UUID):
-    # First, ensure no one else is sharing in the same session
-    db.query(models.SessionParticipant).\
-        filter(models.SessionParticipant.session_id == session_id).\
-        update({models.SessionParticipant.is_sharing_screen: False})
-    
-    # Now, set the current user as the sharer
-    participant = get_participant(db, session_id=session_id, user_id=user_id)
-    if participant:
-        participant.is_sharing_screen = True
-        db.add(participant)
-        db.commit()
-    return participant
-
-def stop_screen_share(db: Session, session_id: uuid.UUID, user_id: uuid.UUID):
-    participant = get_participant(db, session_id=session_id, user_id=user_id)
-    if participant:
+async def start_screen_share(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID):
+    """
+    Makes the user the only sharer in the session and returns every changed row
+    with its roster seq, previous sharers first and the user last. One UPDATE
+    clears the flag for whoever was sharing and sets it for the user.
+    """
+    participants = models.SessionParticipant
+    is_user = participants.user_id == user_id
+    async with unit_of_work(db):
+        # Session row first, like a join, so the two cannot deadlock
+        seq = await next_roster_seq(db, session_id)
+        rows = (await db.execute(
+            update(participants).
+            filter(participants.session_id == session_id, participants.is_sharing_screen | is_user).
+            values(is_sharing_screen=is_user).
+            returning(participants)
+        )).scalars().all()
+        rows = sorted(rows, key=lambda p: p.user_id == user_id)
+        if len(rows) > 1:
+            # Each previous sharer gets a delta with their full state, user included
+            seq = await next_roster_seq(db, session_id, len(rows) - 1)
+            await db.execute(select(participants).options(joinedload(participants.user)).filter(
+                participants.session_id == session_id,
+                participants.user_id.in_([p.user_id for p in rows[:-1]])
+            ))
+    return list(zip(rows, range(seq - len(rows) + 1, seq + 1)))
+
+async def stop_screen_share(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID):
+    participant = await get_participant(db, session_id=session_id, user_id=user_id)
+    if participant is None:
+        return None, None
+    async with unit_of_work(db):
+        seq = await next_roster_seq(db, session_id)
         participant.is_sharing_screen = False
-        db.add(participant)
-        db.commit()
-    return participant
-
-
-def create_chat_message(db: Session, session_id: uuid.UUID, user_id: uuid.UUID, content: str):
-    db_message = models.ChatMessage(
-        session_id=session_id,
-        user_id=user_id,
-        content=content
-    )
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-    return db_message
-
-def get_chat_messages_for_session(db: Session, session_id: uuid.UUID):
+    return participant, seq
+
+
+async def _next_chat_seq(db: AsyncSession, session_id: uuid.UUID, count: int) -> int:
+    # Like next_roster_seq: the row lock orders the batches of one session by commit
+    return (await db.execute(
+        update(models.Session).
+        filter(models.Session.id == session_id).
+        values(chat_seq=models.Session.chat_seq + count, updated_at=models.Session.updated_at).
+        returning(models.Session.chat_seq).
+        execution_options(synchronize_session=False)
+    )).scalar_one()
+
+async def insert_chat_messages(db: AsyncSession, rows: list[dict]):
+    """
+    Stores a batch of chat_messages rows with one multi-row INSERT. Each row
+    gets its session's next seq in the same transaction, so seq order is commit
+    order even with several workers flushing at once. Ids and timestamps are set
+    by the caller, so retrying a batch that was in fact committed inserts
+    nothing twice.
+    """
+    by_session: dict[uuid.UUID, list[dict]] = {}
+    for row in rows:
+        by_session.setdefault(row["session_id"], []).append(row)
+    numbered = []
+    async with unit_of_work(db):
+        # Sessions in a fixed order, so two batches never wait on each other's locks
+        for session_id in sorted(by_session, key=str):
+            session_rows = by_session[session_id]
+            last = await _next_chat_seq(db, session_id, len(session_rows))
+            first = last - len(session_rows) + 1
+            numbered += [{**row, "seq": first + i} for i, row in enumerate(session_rows)]
+        await db.execute(_upsert(db, models.ChatMessage).values(numbered).on_conflict_do_nothing(index_elements=[models.ChatMessage.id]))
+
+async def get_chat_messages_page(db: AsyncSession, session_id: uuid.UUID, limit: int, before: int | None = None, after: int | None = None):
+    """
+    One page of a session's chat in ascending order, keyed on seq. Without a
+    cursor it is the latest `limit` messages. Also returns whether more
+    messages lie beyond the page in the direction of travel.
+    """
+    key = models.ChatMessage.seq
     # Joining with User to get the user's name
-    return db.query(models.ChatMessage).join(models.User).filter(models.ChatMessage.session_id == session_id).order_by(models.ChatMessage.created_at).all()
+    query = select(models.ChatMessage).join(models.ChatMessage.user).options(contains_eager(models.ChatMessage.user)).filter(
+        models.ChatMessage.session_id == session_id
+    )
+    if after is not None:
+        query = query.filter(key > after).order_by(key)
+    else:
+        if before is not None:
+            query = query.filter(key < before)
+        query = query.order_by(key.desc())
+    # One extra row tells us whether there is another page
+    messages = list((await db.execute(query.limit(limit + 1))).scalars().all())
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if after is None:
+        messages.reverse()
+    return messages, has_more
 
 
 # In app/crud.py
 
-def start_recording(db: Session, session: models.Session):
-    session.recording_status = 'RECORDING'
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+async def start_recording(db: AsyncSession, session: models.Session):
+    async with unit_of_work(db):
+        session.recording_status = 'RECORDING'
     return session
 
-def stop_recording(db: Session, session: models.Session, url: str):
-    session.recording_status = 'AVAILABLE'
-    session.recording_url = url
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+async def stop_recording(db: AsyncSession, session: models.Session, url: str):
+    async with unit_of_work(db):
+        session.recording_status = 'AVAILABLE'
+        session.recording_url = url
     return session
 
 
 
 # In app/crud.py
 
-def update_participant_role(db: Session, participant: models.SessionParticipant, new_role: str):
-    participant.role = new_role
-    db.add(participant)
-    db.commit()
-    db.refresh(participant)
-    return participant
+async def update_participant_role(db: AsyncSession, participant: models.SessionParticipant, new_role: str):
+    async with unit_of_work(db):
+        seq = await next_roster_seq(db, participant.session_id)
+        participant.role = new_role
+    return participant, seq
 
 
 
 # In app/crud.py
 
-def get_scheduled_sessions_for_user(db: Session, user_id: uuid.UUID):
-    # Find all session_participant entries where the user is the host
-    host_entries = db.query(models.SessionParticipant).filter(
+async def get_scheduled_sessions_for_user(db: AsyncSession, user_id: uuid.UUID):
+    sessions, _ = await get_hosted_sessions_page(db, user_id=user_id, statuses=['SCHEDULED'], limit=None)
+    return sessions
+
+
+# Statuses whose sessions always have a scheduled start; a calendar asking for
+# any other status (instant meetings have none) is ordered by created_at instead
+SCHEDULED_STATUSES = frozenset({'SCHEDULED', 'CANCELLED'})
+
+def calendar_sort_column(statuses: list[str]):
+    if set(statuses) <= SCHEDULED_STATUSES:
+        return models.Session.scheduled_start_time
+    return models.Session.created_at
+
+async def get_hosted_sessions_page(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    statuses: list[str],
+    limit: int | None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: tuple | None = None,
+):
+    """
+    Sessions the user hosts, in (time, id) order, as a single join of
+    session_participants and sessions. The time is calendar_sort_column: the
+    scheduled start, or created_at when `statuses` include unscheduled kinds.
+    `start`/`end` bound that time (end is exclusive) and `after` is the keyset
+    of the last row of the previous page. Returns the page and whether there is more.
+    """
+    sort_column = calendar_sort_column(statuses)
+    key = tuple_(sort_column, models.Session.id)
+    query = select(models.Session).join(
+        models.SessionParticipant, models.SessionParticipant.session_id == models.Session.id
+    ).filter(
         models.SessionParticipant.user_id == user_id,
-        models.SessionParticipant.role == 'HOST'
-    ).all()
-    
-    # Get the session IDs from those entries
-    session_ids = [entry.session_id for entry in host_entries]
-
-    # Find all sessions that match those IDs and are also scheduled
-    return db.query(models.Session).filter(
-        models.Session.id.in_(session_ids),
-        models.Session.status == 'SCHEDULED'
-    ).order_by(models.Session.scheduled_start_time).all()
-    
-    
-# In app/crud.py
-
-def get_room_by_unique_code(db: Session, unique_code: str):
-    return db.query(models.Room).filter(models.Room.unique_code == unique_code).first()
+        models.SessionParticipant.role == 'HOST',
+        models.Session.status.in_(statuses),
+    )
+    if sort_column is models.Session.scheduled_start_time:
+        # A row without a scheduled start has no place in this order
+        query = query.filter(sort_column.is_not(None))
+    if start is not None:
+        query = query.filter(sort_column >= start)
+    if end is not None:
+        query = query.filter(sort_column < end)
+    if after is not None:
+        query = query.filter(key > tuple_(*after))
+    query = query.order_by(sort_column, models.Session.id)
+    if limit is None:
+        return (await db.execute(query)).scalars().all(), False
+    # One extra row tells us whether there is another page
+    sessions = list((await db.execute(query.limit(limit + 1))).scalars().all())
+    return sessions[:limit], len(sessions) > limit
 
-def get_user_by_id(db: Session, user_id: uuid.UUID):
-    return db.query(models.User).filter(models.User.id == user_id).first()
 
 # In app/crud.py
 
-def create_instant_session(db: Session, user_id: uuid.UUID):
-    # 1. Create a default, non-persistent room for the user
-    default_room_name = f"{get_user_by_id(db, user_id).full_name}'s Instant Meeting"
-    instant_room = create_room_for_user(
-        db=db,
-        room=schemas.RoomCreate(name=default_room_name, is_private=True), # Instant rooms are private by default
-        user_id=user_id
-    )
+async def get_live_session_for_room(db: AsyncSession, room_id: uuid.UUID):
+    result = await db.execute(select(models.Session).filter(
+        models.Session.room_id == room_id,
+        models.Session.status == 'LIVE'
+    ))
+    return result.scalars().first()
+
+async def get_room_by_unique_code(db: AsyncSession, unique_code: str):
+    result = await db.execute(select(models.Room).filter(models.Room.unique_code == unique_code))
+    return result.scalars().first()
+
+async def get_room_join_info(db: AsyncSession, unique_code: str):
+    # Room and its live session id (or None) in one query, via the partial LIVE index
+    result = await db.execute(select(models.Room, models.Session.id).outerjoin(
+        models.Session,
+        (models.Session.room_id == models.Room.id) & (models.Session.status == 'LIVE')
+    ).filter(models.Room.unique_code == unique_code))
+    return result.first()
+
+async def get_user_by_id(db: AsyncSession, user_id: uuid.UUID):
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
 
-    # 2. Immediately start a session in that new room
-    instant_session = start_session_in_room(
-        db=db,
-        room_id=instant_room.id,
-        user_id=user_id
-    )
-    
-    return instant_session
\ No newline at end of file
+# In app/crud.py
+
+async def create_instant_session(db: AsyncSession, user: models.User):
+    # Room, session and host row go out in one flush and one commit
+    async with unit_of_work(db):
+        # 1. Create a default, non-persistent room for the user
+        instant_room = await create_room_for_user(
+            db=db,
+            room=schemas.RoomCreate(name=f"{user.full_name}'s Instant Meeting", is_private=True), # Instant rooms are private by default
+            user_id=user.id
+        )
+
+        # 2. Immediately start a session in that new room
+        instant_session = await start_session_in_room(
+            db=db,
+            room_id=instant_room.id,
+            user_id=user.id
+        )
+
+    return instant_session
@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+from .wire import Frame
+
+# Trickle ICE sends 10-30 candidates within a few hundred milliseconds of a join.
+# With a non-zero window, candidates from one sender to one recipient are held
+# for that long and relayed as a single "ice-candidates" frame. 0 disables it.
+ICE_BATCH_WINDOW_MS = float(os.getenv("ONEVOICE_ICE_BATCH_MS", "0"))
+
+
+class _Batch:
+    __slots__ = ("room_id", "frames", "handle")
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.frames: list[Frame] = []
+        self.handle = None
+
+
+class IceBatcher:
+    def __init__(self, manager, window_ms: float = ICE_BATCH_WINDOW_MS):
+        self.manager = manager
+        self.window = window_ms / 1000
+        self._batches: dict[tuple, _Batch] = {}
+        self._keys_by_sender: dict = {}
+        self.stats = {"candidates": 0, "frames": 0}
+
+    def add(self, sender, room_id: str, message: dict, frame: Frame):
+        """Relays one ice-candidate frame, possibly after coalescing it."""
+        to = message.get("to")
+        to = str(to) if to else None
+        self.stats["candidates"] += 1
+        if self.window <= 0:
+            self._send(frame, room_id, sender, to)
+            return
+        key = (sender, to)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(room_id)
+            self._keys_by_sender.setdefault(sender, set()).add(key)
+            batch.handle = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+        batch.frames.append(frame)
+
+    def flush_sender(self, sender):
+        # Anything else the sender relays (e.g. a new offer) must not overtake its
+        # buffered candidates, and nothing should be left behind on disconnect.
+        for key in list(self._keys_by_sender.get(sender, ())):
+            self._flush(key)
+
+    def _flush(self, key):
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        batch.handle.cancel()
+        sender, to = key
+        keys = self._keys_by_sender[sender]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_sender[sender]
+        if len(batch.frames) == 1:
+            frame = batch.frames[0]
+        else:
+            payload = {k: v for k, v in batch.frames[0].payload.items() if k != "candidate"}
+            payload["type"] = "ice-candidates"
+            payload["candidates"] = [f.payload.get("candidate") for f in batch.frames]
+            frame = Frame(payload=payload)
+        self._send(frame, batch.room_id, sender, to)
+
+    def _send(self, frame: Frame, room_id: str, sender, to):
+        self.stats["frames"] += 1
+        self.manager.publish(frame, room_id, sender, to=to)
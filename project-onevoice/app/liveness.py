@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import math
+import os
+import time
+
+# Heartbeat for signaling sockets. Dead peers are found by the server's
+# protocol-level ping/pong (uvicorn --ws-ping-interval/--ws-ping-timeout), which
+# browsers answer on their own. The app-level reaper below is opt-in: it sends
+# {"type": "ping"} and evicts sockets that stay silent, so only enable it when
+# every client answers with a frame. Instead of pinging every socket on one
+# global tick, each connection has its own deadline on a timing wheel, so the
+# work per tick is only the sockets that are actually due.
+REAP_SILENT = os.getenv("ONEVOICE_WS_REAP_SILENT", "0") == "1"
+PING_INTERVAL = float(os.getenv("ONEVOICE_WS_PING_INTERVAL", "20"))
+PONG_TIMEOUT = float(os.getenv("ONEVOICE_WS_PONG_TIMEOUT", "10"))
+TICK = 1.0
+PING_MESSAGE = '{"type": "ping"}'
+
+
+class TimingWheel:
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots: list[set] = [set() for _ in range(slots)]
+        self.position = 0
+        self._slot_of: dict = {}
+
+    def schedule(self, item, delay: float):
+        self.cancel(item)
+        ticks = min(max(1, math.ceil(delay / self.tick)), len(self.slots) - 1)
+        index = (self.position + ticks) % len(self.slots)
+        self.slots[index].add(item)
+        self._slot_of[item] = index
+
+    def cancel(self, item):
+        index = self._slot_of.pop(item, None)
+        if index is not None:
+            self.slots[index].discard(item)
+
+    def advance(self) -> set:
+        self.position = (self.position + 1) % len(self.slots)
+        due = self.slots[self.position]
+        self.slots[self.position] = set()
+        for item in due:
+            del self._slot_of[item]
+        return due
+
+    def __len__(self):
+        return len(self._slot_of)
+
+
+class Reaper:
+    """
+    Pings sockets that have been quiet for PING_INTERVAL and evicts the ones
+    that send nothing back within PONG_TIMEOUT. Any inbound frame, not just a
+    pong, counts as proof of life. Does nothing unless enabled (REAP_SILENT).
+    """
+
+    def __init__(self, manager, interval: float = PING_INTERVAL, timeout: float = PONG_TIMEOUT, enabled: bool = REAP_SILENT):
+        self.manager = manager
+        self.enabled = enabled
+        self.interval = interval
+        self.timeout = timeout
+        self.wheel = TimingWheel(TICK, math.ceil(max(interval, timeout) / TICK) + 2)
+        self.stats = {"pings": 0, "pongs": 0, "reaped": 0}
+        self._task = None
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def track(self, conn):
+        conn.last_seen = time.monotonic()
+        if self.enabled:
+            self.wheel.schedule(conn, self.interval)
+
+    def untrack(self, conn):
+        self.wheel.cancel(conn)
+
+    def seen(self, conn):
+        conn.last_seen = time.monotonic()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TICK)
+            for conn in self.wheel.advance():
+                try:
+                    self._check(conn)
+                except Exception:
+                    logging.exception("Heartbeat check failed")
+
+    def _check(self, conn):
+        now = time.monotonic()
+        pinged_at, conn.ping_sent = conn.ping_sent, None
+        if pinged_at is not None:
+            if conn.last_seen < pinged_at:
+                self.stats["reaped"] += 1
+                self.manager.evict(conn.websocket, reason="pong timeout")
+                return
+            self.stats["pongs"] += 1
+        idle = now - conn.last_seen
+        if idle < self.interval:
+            self.wheel.schedule(conn, self.interval - idle)
+            return
+        conn.ping_sent = now
+        self.stats["pings"] += 1
+        self.manager.send_direct(conn.websocket, PING_MESSAGE)
+        self.wheel.schedule(conn, self.timeout)
@@ -0,0 +1,233 @@
+import bisect
+import logging
+import re
+import time
+from contextvars import ContextVar
+from threading import get_ident
+
+# Metrics are recorded without locks: every thread writes to its own shard (the
+# event loop is one thread, the request threadpool a few more) and a scrape sums
+# the shards. A scrape racing a write may miss that one observation; nothing is
+# ever lost or double-counted after it.
+
+# Latency buckets in seconds, from sub-millisecond up to the pool timeout range
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Small counts: statements per request, sockets per broadcast
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, sum and count (Prometheus-style)."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # thread id -> [count per bucket..., +Inf count, sum]
+        self._shards: dict[int, list] = {}
+
+    def observe(self, value: float):
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards.setdefault(get_ident(), [0] * (len(self.buckets) + 1) + [0.0])
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> dict:
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in list(self._shards.values()):
+            for i in range(len(counts)):
+                counts[i] += shard[i]
+            total += shard[-1]
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+
+class Counter:
+    """Monotonic counter, sharded per thread like Histogram."""
+
+    def __init__(self):
+        self._shards: dict[int, float] = {}
+
+    def inc(self, amount: float = 1):
+        ident = get_ident()
+        self._shards[ident] = self._shards.get(ident, 0) + amount
+
+    @property
+    def value(self) -> float:
+        return sum(list(self._shards.values()))
+
+
+class Family:
+    """A named metric with labels; one child Counter or Histogram per label set."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), kind: str = "histogram", buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.kind = kind
+        self.buckets = buckets
+        self._children: dict[tuple, object] = {}
+        registry.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, Histogram(self.buckets) if self.kind == "histogram" else Counter())
+        return child
+
+    def remove(self, *values):
+        self._children.pop(values, None)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, values)), child
+
+
+registry: list[Family] = []
+# Callables run at scrape time for values that are cheaper to read than to track:
+# each returns [(name, type, help, [(labels, value), ...]), ...]
+collectors: list = []
+
+http_request_seconds = Family("onevoice_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+http_exceptions = Family("onevoice_http_exceptions_total", "Unhandled exceptions by route and type", ("route", "exception"), kind="counter")
+db_statements_per_request = Family("onevoice_db_statements_per_request", "SQL statements run per HTTP request", ("route",), buckets=COUNT_BUCKETS)
+db_seconds_per_request = Family("onevoice_db_seconds_per_request", "Time spent in SQL per HTTP request", ("route",))
+db_statement_seconds = Family("onevoice_db_statement_duration_seconds", "Latency of single SQL statements")
+broadcast_fanout = Family("onevoice_ws_broadcast_fanout", "Sockets a signaling frame was queued for", buckets=COUNT_BUCKETS)
+# No room label: /metrics is public, and a room id is enough to join the room
+ws_delivery_seconds = Family("onevoice_ws_delivery_seconds", "Time from publishing a frame to sending it on a socket")
+
+
+# --- Per-request DB accounting ---
+# The middleware opens a RequestDB for each request; engine events add to it.
+# Statements outside a request (background tasks) only reach the per-statement
+# histogram.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_PARAM_LISTS = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """`statement` with literals and IN-lists collapsed, so runs of the same query compare equal."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _PARAM_LISTS.sub("(...)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+class RequestDB:
+    """Database work of one HTTP request."""
+
+    __slots__ = ("statements", "seconds", "fingerprints")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        # fingerprint -> runs; only kept while the SQL profiler is on (app.profiling)
+        self.fingerprints: dict[str, int] | None = None
+
+
+request_db: ContextVar[RequestDB | None] = ContextVar("onevoice_request_db", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("onevoice_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["onevoice_started"].pop()
+    db_statement_seconds.labels().observe(elapsed)
+    tally = request_db.get()
+    if tally is not None:
+        tally.statements += 1
+        tally.seconds += elapsed
+        if tally.fingerprints is not None:
+            key = fingerprint(statement)
+            tally.fingerprints[key] = tally.fingerprints.get(key, 0) + 1
+
+
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_execute)
+    event.listen(target, "after_cursor_execute", _after_execute)
+
+
+def route_label(scope) -> str:
+    # The route template, never the raw path, so ids do not explode the label set
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and its database work, by route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        tally = RequestDB()
+        token = request_db.set(tally)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_db.reset(token)
+            route = route_label(scope)
+            http_request_seconds.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+            db_statements_per_request.labels(route).observe(tally.statements)
+            db_seconds_per_request.labels(route).observe(tally.seconds)
+
+
+def record_exception(scope, exc: BaseException):
+    http_exceptions.labels(route_label(scope), type(exc).__name__).inc()
+    logging.error(f"Unhandled {type(exc).__name__} on {scope.get('method')} {scope.get('path')}", exc_info=exc)
+
+
+# --- Prometheus text exposition ---
+
+def _labels(labels: dict, **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+
+def render() -> str:
+    lines = []
+    for family in registry:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for labels, child in family.samples():
+            if family.kind == "counter":
+                lines.append(f"{family.name}{_labels(labels)} {child.value}")
+                continue
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{family.name}_bucket{_labels(labels, le=bound)} {count}")
+            lines.append(f"{family.name}_sum{_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{family.name}_count{_labels(labels)} {snapshot['count']}")
+    for collect in collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,6 @@
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, String, Text, TIMESTAMP, func, Boolean, ForeignKey
+from sqlalchemy import Column, String, Text, TIMESTAMP, func, Boolean, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import relationship
 from sqlalchemy import Enum
 
@@ -8,6 +8,8 @@ from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    # Server defaults come back via RETURNING on flush, so writes need no refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
@@ -20,6 +22,7 @@ class User(Base):
     
 class Room(Base):
     __tablename__ = "rooms"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
@@ -52,6 +55,14 @@ class Room(Base):
     
 class Session(Base):
     __tablename__ = "sessions"
+    __mapper_args__ = {"eager_defaults": True}
+    # Serves the calendar: one status, ordered by scheduled start
+    __table_args__ = (
+        Index("idx_sessions_status_scheduled_start", "status", "scheduled_start_time"),
+        # Live session of a room; partial, since only a handful of rows are ever LIVE
+        Index("idx_sessions_room_live", "room_id",
+              postgresql_where=text("status = 'LIVE'"), sqlite_where=text("status = 'LIVE'")),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     room_id = Column(UUID(as_uuid=True), ForeignKey("rooms.id"), nullable=False)
@@ -66,6 +77,10 @@ class Session(Base):
     recording_status = Column(Enum('RECORDING', 'STOPPED', 'AVAILABLE', name='recording_status'), nullable=True)
     recording_url = Column(Text, nullable=True)
     # ------------------------------------
+    # Last roster-delta seq handed out for this session (crud.next_roster_seq)
+    roster_seq = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # Last chat message seq handed out for this session (crud.insert_chat_messages)
+    chat_seq = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     room = relationship("Room")
     participants = relationship("SessionParticipant", back_populates="session")
@@ -73,6 +88,11 @@ class Session(Base):
     
 class SessionParticipant(Base):
     __tablename__ = "session_participants"
+    __mapper_args__ = {"eager_defaults": True}
+    # The primary key leads with session_id; this covers "sessions I host"
+    __table_args__ = (
+        Index("idx_session_participants_user_role", "user_id", "role"),
+    )
 
     session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"), primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
@@ -90,11 +110,17 @@ class SessionParticipant(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    # Serves keyset pagination of a session's history in seq (commit) order
+    __table_args__ = (
+        Index("idx_chat_messages_session_seq", "session_id", "seq"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
+    # Per-session position, handed out in commit order; what history pages on
+    seq = Column(Integer, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
 
     session = relationship("Session")
@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException
+
+# Keyset pagination cursors: the sort key of the last row a page returned,
+# opaque to clients. Shared by chat history and the session calendar.
+
+
+def encode_cursor(*key) -> str:
+    text = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in key)
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Parses a cursor from encode_cursor into `types` (e.g. datetime, uuid.UUID); 400 if it does not fit."""
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(parts) != len(types):
+            raise ValueError("wrong number of key parts")
+        return tuple(datetime.fromisoformat(part) if kind is datetime else kind(part) for kind, part in zip(types, parts))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
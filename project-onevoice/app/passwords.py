@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+# Argon2 is CPU-bound, so hashing and verification run in a small process pool
+# instead of on the event loop or in the request threadpool. Only a bounded
+# number of jobs may be queued; beyond that callers get PasswordPoolBusy and the
+# API answers 503 with Retry-After instead of letting logins pile up.
+# ONEVOICE_PASSWORD_WORKERS=0 runs the work in the threadpool instead. If a worker
+# dies (OOM kill, crash in the hash library) the pool is replaced and the job retried once.
+PASSWORD_WORKERS = int(os.getenv("ONEVOICE_PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("ONEVOICE_PASSWORD_QUEUE_LIMIT", "64"))
+PASSWORD_RETRY_AFTER = int(os.getenv("ONEVOICE_PASSWORD_RETRY_AFTER", "1"))
+
+# Argon2 cost parameters; passlib's defaults apply to any that are not set
+ARGON2_SETTINGS = {
+    f"argon2__{name}": int(os.environ[var])
+    for name, var in (
+        ("time_cost", "ONEVOICE_ARGON2_TIME_COST"),
+        ("memory_cost", "ONEVOICE_ARGON2_MEMORY_COST"),
+        ("parallelism", "ONEVOICE_ARGON2_PARALLELISM"),
+    )
+    if os.getenv(var)
+}
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **ARGON2_SETTINGS)
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many hashing jobs are already queued."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.stats = {"hashed": 0, "verified": 0, "rejected": 0, "restarts": 0}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                # spawn, not fork: the server process has an event loop and threads running
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace(self, broken: ProcessPoolExecutor):
+        # Every job on a broken pool fails; only the first to notice replaces it
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logging.error("Password worker process died; starting a new pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.stats["restarts"] += 1
+        self.start()
+
+    async def _submit(self, fn, *args):
+        self.start()
+        executor = self._executor
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self.in_flight >= self.queue_limit:
+            self.stats["rejected"] += 1
+            raise PasswordPoolBusy()
+        self.in_flight += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool:
+                return await self._submit(fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(hash_password_sync, password)
+        self.stats["hashed"] += 1
+        return hashed
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        valid = await self._run(verify_password_sync, plain_password, hashed_password)
+        self.stats["verified"] += 1
+        return valid
+
+
+password_hasher = PasswordHasher()
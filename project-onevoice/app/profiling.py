@@ -0,0 +1,152 @@
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from . import database
+from .metrics import RequestDB, fingerprint, request_db
+
+# --- Per-request SQL profiler ---
+# Opt-in: with ONEVOICE_SQL_PROFILE=1 every HTTP response carries an
+# X-SQL-Profile header, and requests over any threshold are logged with the
+# statements they repeated, which is what an N+1 looks like. It reads the
+# per-request tally that app.metrics already keeps, adding only fingerprints.
+PROFILE_ENABLED = os.getenv("ONEVOICE_SQL_PROFILE", "0") == "1"
+PROFILE_MAX_STATEMENTS = int(os.getenv("ONEVOICE_SQL_PROFILE_MAX_STATEMENTS", "20"))
+PROFILE_MAX_SECONDS = float(os.getenv("ONEVOICE_SQL_PROFILE_MAX_SECONDS", "0.25"))
+# The same statement run more often than this in one request is reported
+PROFILE_MAX_REPEATS = int(os.getenv("ONEVOICE_SQL_PROFILE_MAX_REPEATS", "3"))
+PROFILE_HEADER = "X-SQL-Profile"
+
+
+class StatementCounter:
+    """Collects the SQL statements an engine executes while it is attached."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        # BEGIN/COMMIT/ROLLBACK are round trips too, but not cursor executions
+        self.transactions: list[str] = []
+        self.fingerprints: Counter = Counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.statements) + len(self.transactions)
+
+    def repeated(self, at_least: int = 2) -> list[tuple[str, int]]:
+        """Fingerprints run at least `at_least` times, most repeated first."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= at_least]
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def _on_begin(self, conn):
+        self.transactions.append("BEGIN")
+
+    def _on_commit(self, conn):
+        self.transactions.append("COMMIT")
+
+    def _on_rollback(self, conn):
+        self.transactions.append("ROLLBACK")
+
+
+@contextmanager
+def count_statements(engine=None):
+    """
+    Counts statements run on `engine` (the app's async engine by default)
+    inside the block. Everything on that engine is counted, so run it
+    around one request at a time.
+    """
+    engine = engine if engine is not None else database.async_engine
+    target = getattr(engine, "sync_engine", engine)
+    counter = StatementCounter()
+    hooks = [
+        ("before_cursor_execute", counter._on_execute),
+        ("begin", counter._on_begin),
+        ("commit", counter._on_commit),
+        ("rollback", counter._on_rollback),
+    ]
+    for name, fn in hooks:
+        event.listen(target, name, fn)
+    try:
+        yield counter
+    finally:
+        for name, fn in hooks:
+            event.remove(target, name, fn)
+
+
+def assert_query_budget(client, method: str, url: str, max_statements: int, max_repeats: int | None = None,
+                        engine=None, **request_kwargs):
+    """
+    Sends one request through `client` (a TestClient) and raises AssertionError
+    if it ran more than `max_statements` statements, or any one statement more
+    than `max_repeats` times. Returns the response and its StatementCounter.
+
+        assert_query_budget(client, "GET", f"/api/v1/sessions/{session_id}", 2, max_repeats=1, headers=auth)
+    """
+    with count_statements(engine) as counter:
+        response = client.request(method, url, **request_kwargs)
+    problems = []
+    if counter.count > max_statements:
+        problems.append(f"{counter.count} statements, budget is {max_statements}")
+    if max_repeats is not None:
+        problems += [f"{n}x (max {max_repeats}): {fp}" for fp, n in counter.repeated(max_repeats + 1)]
+    if problems:
+        listing = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(f"{method} {url} over its query budget: " + "; ".join(problems) + f"\n{listing}")
+    return response, counter
+
+
+def summary(tally: RequestDB) -> str:
+    top = max((tally.fingerprints or {}).values(), default=0)
+    return f"statements={tally.statements}; db_ms={tally.seconds * 1000:.1f}; max_repeat={top}"
+
+
+class SQLProfilerMiddleware:
+    """
+    ASGI middleware profiling the SQL of every HTTP request; see PROFILE_* above.
+    Install it inside MetricsMiddleware to share its tally; on its own it opens one.
+    """
+
+    def __init__(self, app, max_statements: int = PROFILE_MAX_STATEMENTS, max_seconds: float = PROFILE_MAX_SECONDS,
+                 max_repeats: int = PROFILE_MAX_REPEATS):
+        self.app = app
+        self.max_statements = max_statements
+        self.max_seconds = max_seconds
+        self.max_repeats = max_repeats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        tally = request_db.get()
+        token = None
+        if tally is None:
+            tally = RequestDB()
+            token = request_db.set(tally)
+        tally.fingerprints = {}
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                header = (PROFILE_HEADER.lower().encode(), summary(tally).encode())
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if token is not None:
+                request_db.reset(token)
+            self._report(scope, tally)
+
+    def _report(self, scope, tally: RequestDB):
+        repeated = sorted(((n, fp) for fp, n in tally.fingerprints.items() if n > self.max_repeats), reverse=True)
+        if tally.statements <= self.max_statements and tally.seconds <= self.max_seconds and not repeated:
+            return
+        details = "".join(f"\n  {n}x {fp}" for n, fp in repeated[:5])
+        logging.warning(f"SQL profile over budget on {scope['method']} {scope['path']}: {summary(tally)}{details}")
@@ -0,0 +1,59 @@
+import uuid
+from functools import lru_cache
+from operator import attrgetter
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+# Returning a Response from a route skips FastAPI's response_model validation and
+# its jsonable_encoder/json.dumps pass. The response_model stays on the route for
+# the OpenAPI docs; these helpers produce the same JSON directly.
+
+
+def _default(obj):
+    # orjson only encodes uuid.UUID itself; asyncpg hands back its own subclass
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError
+
+
+class FastJSONResponse(Response):
+    """JSON via orjson, which encodes UUIDs and datetimes natively."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # UTC as "Z", the way pydantic writes it
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+@lru_cache(maxsize=None)
+def serializer(schema: type[BaseModel]) -> TypeAdapter:
+    """Compiled validator/serializer for `schema`, built once per schema."""
+    return TypeAdapter(schema)
+
+
+def model_response(schema: type[BaseModel], obj, status_code: int = 200) -> Response:
+    """`obj` (an ORM object or dict) validated as `schema` and serialized straight to JSON bytes."""
+    adapter = serializer(schema)
+    body = adapter.dump_json(adapter.validate_python(obj, from_attributes=True), by_alias=True)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+@lru_cache(maxsize=None)
+def _row_plan(schema: type[BaseModel]):
+    # Output keys and the attributes they come from; an alias names both, as with from_attributes
+    keys = tuple(field.alias or name for name, field in schema.model_fields.items())
+    getter = attrgetter(*keys)
+    return keys, (getter if len(keys) > 1 else lambda row: (getter(row),))
+
+
+def orm_rows(schema: type[BaseModel], rows) -> list[dict]:
+    """
+    ORM rows as plain dicts with the fields of `schema`, ready for
+    FastJSONResponse. Values are taken as they are, without validation, so use
+    it for rows whose columns already have the schema's types.
+    """
+    keys, getter = _row_plan(schema)
+    return [dict(zip(keys, getter(row))) for row in rows]
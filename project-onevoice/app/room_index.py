@@ -0,0 +1,108 @@
+import os
+import uuid
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from . import crud, database, models
+from .cache import TTLCache
+from .signaling import manager
+
+# --- Room join index ---
+# Invite links resolve a room code to the room's metadata and its current live
+# session. Entries are kept in process memory and corrected in place when a
+# session starts, ends or is cancelled, and dropped when the room changes. The
+# worker that commits the change applies it and announces it on the backplane,
+# so every other worker applies it too; the TTL only bounds staleness when a
+# notice is lost, e.g. while a worker reconnects to the broker.
+ROOM_INDEX_TTL_SECONDS = int(os.getenv("ONEVOICE_ROOM_INDEX_TTL", "30"))
+ROOM_INDEX_SIZE = int(os.getenv("ONEVOICE_ROOM_INDEX_SIZE", "10000"))
+
+
+class RoomIndex:
+    def __init__(self, maxsize: int = ROOM_INDEX_SIZE, ttl: float = ROOM_INDEX_TTL_SECONDS):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # room_id -> unique_code, so transitions can find the entry to correct
+        self._codes = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def lookup(self, unique_code: str) -> dict | None:
+        """Join info for `unique_code`, or None if there is no such room."""
+        return await self.entries.get_or_load(unique_code, lambda: self._load(unique_code))
+
+    async def _load(self, unique_code: str):
+        # Own session, so the cached entry is not tied to any request
+        async with database.AsyncSessionLocal() as db:
+            found = await crud.get_room_join_info(db, unique_code=unique_code)
+        if found is None:
+            return None
+        room, live_session_id = found
+        self._codes.set(room.id, unique_code)
+        return {
+            "room_id": room.id,
+            "name": room.name,
+            "is_private": room.is_private,
+            "live_session_id": live_session_id,
+        }
+
+    def session_changed(self, room_id: uuid.UUID, session_id: uuid.UUID, status: str):
+        code = self._codes.get(room_id)
+        entry = self.entries.get(code) if code is not None else None
+        if entry is None:
+            return
+        if status == 'LIVE':
+            live_session_id = session_id
+        elif entry["live_session_id"] == session_id:
+            live_session_id = None
+        else:
+            return
+        self.entries.set(code, {**entry, "live_session_id": live_session_id})
+
+    def drop_room(self, room_id: uuid.UUID):
+        code = self._codes.get(room_id)
+        if code is not None:
+            self.entries.pop(code)
+            self._codes.pop(room_id)
+
+    def clear(self):
+        self.entries.clear()
+        self._codes.clear()
+
+
+room_index = RoomIndex()
+
+
+def _receive_remote(notice: dict):
+    for room_id in notice.get("rooms", ()):
+        room_index.drop_room(uuid.UUID(room_id))
+    for room_id, session_id, status in notice.get("sessions", ()):
+        room_index.session_changed(uuid.UUID(room_id), uuid.UUID(session_id), status)
+
+manager.listeners["room-index"] = _receive_remote
+
+
+@event.listens_for(models.Session, "after_insert")
+@event.listens_for(models.Session, "after_update")
+def _record_transition(mapper, connection, target):
+    if inspect(target).attrs.status.history.has_changes():
+        database.defer(object_session(target), "room_index", ("session", target.room_id, target.id, target.status))
+
+@event.listens_for(models.Room, "after_update")
+@event.listens_for(models.Room, "after_delete")
+def _record_room_change(mapper, connection, target):
+    room_index.drop_room(target.id)
+    # Also dropped after commit: a lookup in between may have cached the old row again
+    database.defer(object_session(target), "room_index", ("room", target.id))
+
+def _apply_on_commit(changes: list):
+    rooms = {change[1] for change in changes if change[0] == "room"}
+    sessions = [change[1:] for change in changes if change[0] == "session"]
+    for room_id in rooms:
+        room_index.drop_room(room_id)
+    for room_id, session_id, status in sessions:
+        room_index.session_changed(room_id, session_id, status)
+    manager.notify("room-index", {
+        "rooms": [str(room_id) for room_id in rooms],
+        "sessions": [[str(room_id), str(session_id), status] for room_id, session_id, status in sessions],
+    })
+
+database.on_commit("room_index", _apply_on_commit)
@@ -0,0 +1,106 @@
+import os
+
+from .cache import TTLCache
+from .signaling import manager
+from .wire import Frame
+
+# Roster changes are pushed over the room's signaling socket as deltas with a
+# per-session sequence number. The last ROSTER_HISTORY deltas of each session
+# are kept so a client that missed some can catch up without a full snapshot.
+ROSTER_HISTORY = int(os.getenv("ONEVOICE_ROSTER_HISTORY", "256"))
+ROSTER_TTL_SECONDS = 12 * 60 * 60
+
+JOIN = "join"
+LEAVE = "leave"
+ROLE = "role"
+SHARING = "sharing"
+
+
+def participant_payload(participant, user=None) -> dict:
+    user = user if user is not None else participant.user
+    return {
+        "user_id": str(participant.user_id),
+        "full_name": user.full_name,
+        "email": user.email,
+        "role": participant.role,
+        "join_time": participant.join_time.isoformat() if participant.join_time else None,
+        "is_sharing_screen": bool(participant.is_sharing_screen),
+    }
+
+
+class RosterLog:
+    __slots__ = ("seq", "deltas")
+
+    def __init__(self):
+        self.seq = 0
+        # seq -> delta. Deltas from other workers can arrive out of order, so a
+        # gap is only filled once the missing one shows up
+        self.deltas: dict[int, dict] = {}
+
+
+class RosterFeed:
+    """
+    Fans roster deltas out to the room and keeps recent history for catch-up.
+    Sequence numbers come from the session row (crud.next_roster_seq), so they
+    agree across workers. Deltas describe the participant's new state, so
+    replaying one the client has already applied is harmless.
+    """
+
+    def __init__(self, manager, history: int = ROSTER_HISTORY):
+        self.manager = manager
+        self.history = history
+        self.logs = TTLCache(maxsize=10_000, ttl=ROSTER_TTL_SECONDS)
+        manager.listeners["roster"] = self._receive_remote
+
+    def _log(self, session_id: str) -> RosterLog:
+        log = self.logs.get(session_id)
+        if log is None:
+            log = RosterLog()
+        self.logs.set(session_id, log)
+        return log
+
+    def _record(self, delta: dict):
+        log = self._log(delta["session_id"])
+        log.deltas[delta["seq"]] = delta
+        log.seq = max(log.seq, delta["seq"])
+        while len(log.deltas) > self.history:
+            del log.deltas[min(log.deltas)]
+
+    def publish(self, session_id: str, room_id: str, event: str, participant: dict, seq: int) -> dict:
+        delta = {
+            "type": "roster-delta",
+            "session_id": session_id,
+            "seq": seq,
+            "event": event,
+            "participant": participant,
+        }
+        self._record(delta)
+        self.manager.publish(Frame(payload=delta), room_id, None, kind="roster")
+        return delta
+
+    def _receive_remote(self, delta: dict):
+        # Keep the history in step with deltas from other workers
+        self._record(delta)
+
+    def current_seq(self, session_id: str) -> int:
+        log = self.logs.get(session_id)
+        return log.seq if log else 0
+
+    def since(self, session_id: str, seq: int) -> list[dict] | None:
+        """Deltas after `seq`, or None when this worker does not hold all of them."""
+        log = self.logs.get(session_id)
+        current = log.seq if log else 0
+        if seq > current:
+            return None
+        if seq == current:
+            return []
+        missed = range(seq + 1, current + 1)
+        if any(n not in log.deltas for n in missed):
+            return None
+        return [log.deltas[n] for n in missed]
+
+    def drop(self, session_id: str):
+        self.logs.pop(session_id)
+
+
+roster = RosterFeed(manager)
@@ -3,16 +3,36 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 import logging
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from .. import crud, schemas, security, database
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, schemas, security, database, passwords
 
 router = APIRouter(
     prefix="/api/v1/auth",
     tags=["Authentication"]
 )
 
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts right now, please retry shortly.",
+        headers={"Retry-After": str(passwords.PASSWORD_RETRY_AFTER)},
+    )
+
+async def hash_or_503(password: str) -> str:
+    try:
+        return await passwords.password_hasher.hash(password)
+    except passwords.PasswordPoolBusy:
+        raise password_pool_busy()
+
+async def verify_or_503(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await passwords.password_hasher.verify(plain_password, hashed_password)
+    except passwords.PasswordPoolBusy:
+        raise password_pool_busy()
+
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
     try:
         # Password Strength Check
         password = user.password
@@ -33,14 +53,15 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
             )
 
         # Check for existing email
-        db_user = crud.get_user_by_email(db, email=user.email)
+        db_user = await crud.get_user_by_email(db, email=user.email)
         if db_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        new_user = crud.create_user(db=db, user=user)
+        password_hash = await hash_or_503(password)
+        new_user = await crud.create_user(db=db, user=user, password_hash=password_hash)
         content = {
             "data": {
                 "id": str(new_user.id),
@@ -58,10 +79,10 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
 
 
 @router.post("/login", response_model=schemas.TokenPair)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_db)):
+    user = await crud.get_user_by_email(db, email=form_data.username)
     
-    if not user or not security.verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_or_503(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -73,7 +94,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post("/refresh", response_model=schemas.TokenPair)
-def refresh_tokens(payload: schemas.RefreshRequest):
+async def refresh_tokens(payload: schemas.RefreshRequest):
     try:
         data = security.verify_refresh_token(payload.refresh_token)
         subject = data.get("sub")
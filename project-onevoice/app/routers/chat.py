@@ -1,8 +1,10 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from .. import crud, schemas, security, database, models
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, schemas, security, database, models, chat_pipeline
+from ..pagination import decode_cursor, encode_cursor
+from ..responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/api/v1/sessions/{session_id}/chat",
@@ -10,42 +12,76 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.MessageOut)
-def send_chat_message(
+async def send_chat_message(
     session_id: uuid.UUID,
     message: schemas.MessageCreate,
-    db: Session = Depends(database.get_db),
+    durable: bool = False,
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     # Authorization: Check if user is an active participant
-    participant = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    participant = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not participant or participant.leave_time is not None:
         raise HTTPException(status_code=403, detail="User is not an active participant in this session")
 
-    new_message = crud.create_chat_message(db, session_id=session_id, user_id=current_user.id, content=message.content)
-    
+    session = await crud.get_session_by_id(db, session_id=session_id)
+
+    # Published to the room now; persisted by the write-behind buffer
+    # (durable=true waits for the commit before responding)
+    try:
+        new_message = await chat_pipeline.send_chat(
+            session_id, str(session.room_id), current_user, message.content, durable=durable
+        )
+    except chat_pipeline.ChatBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Chat cannot be stored right now, please retry shortly.",
+            headers={"Retry-After": str(chat_pipeline.CHAT_RETRY_AFTER)},
+        )
+
     return {
-        "id": new_message.id,
-        "session_id": new_message.session_id,
-        "user_id": new_message.user_id,
+        "id": new_message["id"],
+        "session_id": new_message["session_id"],
+        "user_id": new_message["user_id"],
         "user_full_name": current_user.full_name,
-        "content": new_message.content,
-        "created_at": new_message.created_at
+        "content": new_message["content"],
+        "created_at": new_message["created_at"]
     }
 
 
+CHAT_PAGE_DEFAULT = 50
+CHAT_PAGE_MAX = 200
+
+
 @router.get("/", response_model=schemas.MessageListResponse)
-def get_chat_history(
+async def get_chat_history(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(CHAT_PAGE_DEFAULT, ge=1, le=CHAT_PAGE_MAX),
+    db: AsyncSession = Depends(database.get_read_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
+    """
+    Chat history, one page at a time. With no cursor this returns the latest
+    `limit` messages, which is what a client joining late needs. Follow
+    `prev_cursor` with `before` for older pages and `next_cursor` with
+    `after` for anything newer.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
     # Authorization: Check if user is an active participant
-    participant = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    participant = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not participant:
         raise HTTPException(status_code=403, detail="User is not a participant in this session")
 
-    messages = crud.get_chat_messages_for_session(db, session_id=session_id)
-    
+    messages, has_more = await crud.get_chat_messages_page(
+        db, session_id=session_id, limit=limit,
+        before=decode_cursor(before, int)[0] if before else None,
+        after=decode_cursor(after, int)[0] if after else None,
+    )
+
     # Format the response
     messages_out = [
         {
@@ -58,4 +94,10 @@ def get_chat_history(
         }
         for msg in messages
     ]
-    return {"data": messages_out}
\ No newline at end of file
+    # Paging forward there are always older messages; paging back only if the page was full
+    older = has_more if not after else bool(messages)
+    return FastJSONResponse({
+        "data": messages_out,
+        "prev_cursor": encode_cursor(messages[0].seq) if messages and older else None,
+        "next_cursor": encode_cursor(messages[-1].seq) if messages else after,
+    })
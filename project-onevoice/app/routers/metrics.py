@@ -0,0 +1,103 @@
+from anyio import to_thread
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .. import database, metrics, security
+from ..passwords import password_hasher
+from ..room_index import room_index
+from ..signaling import manager
+
+router = APIRouter(
+    prefix="/api/v1/metrics",
+    tags=["Metrics"]
+)
+
+# Prometheus scrape endpoint, at the conventional /metrics
+scrape_router = APIRouter(tags=["Metrics"])
+
+
+# Upper bounds of the room-size buckets; rooms are never labelled by id
+ROOM_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100)
+
+
+def _room_size_label(size: int) -> str:
+    lower = 1
+    for bound in ROOM_SIZE_BUCKETS:
+        if size <= bound:
+            return str(bound) if lower == bound else f"{lower}-{bound}"
+        lower = bound + 1
+    return f"{lower}+"
+
+
+def _signaling_metrics():
+    by_size = {}
+    for conns in list(manager.active_connections.values()):
+        label = _room_size_label(len(conns))
+        by_size[label] = by_size.get(label, 0) + 1
+    return [
+        ("onevoice_ws_connections", "gauge", "Open signaling sockets", [({}, len(manager.connections))]),
+        ("onevoice_ws_rooms", "gauge", "Rooms with open sockets, by number of sockets",
+         [({"size": label}, count) for label, count in by_size.items()]),
+        ("onevoice_ws_frames_sent_total", "counter", "Frames queued to sockets", [({}, manager.stats["sent"])]),
+        ("onevoice_ws_evictions_total", "counter", "Sockets evicted as slow or dead", [({}, manager.stats["evicted"])]),
+        ("onevoice_ws_heartbeat_total", "counter", "Heartbeat outcomes: pings sent, pongs seen, sockets reaped",
+         [({"outcome": outcome}, count) for outcome, count in manager.liveness.stats.items()]),
+        ("onevoice_backplane_messages_total", "counter", "Envelopes published to other workers, or dropped while the broker was backlogged",
+         [({"outcome": outcome}, count) for outcome, count in manager.backplane.stats.items()]),
+    ]
+
+def _threadpool_metrics():
+    limiter = to_thread.current_default_thread_limiter()
+    return [
+        ("onevoice_threadpool_threads", "gauge", "Request threadpool size", [({}, limiter.total_tokens)]),
+        ("onevoice_threadpool_busy", "gauge", "Threadpool threads in use", [({}, limiter.borrowed_tokens)]),
+        ("onevoice_threadpool_waiting", "gauge", "Calls waiting for a free thread", [({}, limiter.statistics().tasks_waiting)]),
+        ("onevoice_password_jobs_in_flight", "gauge", "Password hashing jobs running or queued", [({}, password_hasher.in_flight)]),
+    ]
+
+def _db_pool_metrics():
+    pool = database.pool_status()
+    wait = pool["checkout_wait_seconds"]
+    return [
+        ("onevoice_db_pool_checked_out", "gauge", "Database connections in use", [({}, pool["checked_out"])]),
+        ("onevoice_db_pool_overflow", "gauge", "Overflow connections open", [({}, pool["overflow"])]),
+        ("onevoice_db_pool_timeouts_total", "counter", "Checkouts that timed out", [({}, pool["timeouts"])]),
+        ("onevoice_db_pool_wait_seconds_sum", "counter", "Total time spent waiting for a connection", [({}, wait["sum"])]),
+        ("onevoice_db_pool_wait_seconds_count", "counter", "Connection checkouts", [({}, wait["count"])]),
+    ]
+
+metrics.collectors.extend([_signaling_metrics, _threadpool_metrics, _db_pool_metrics])
+
+
+@scrape_router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Everything above plus per-route latency, per-request DB work and signaling
+    fan-out, in the Prometheus text format. Unauthenticated, like the rest.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/db-pool")
+async def get_db_pool_metrics():
+    """
+    Live state of the database connection pool: connections checked out,
+    overflow in use, overflow/timeout counts and a checkout wait-time histogram.
+    """
+    return database.pool_status()
+
+@router.get("/db-replica")
+async def get_db_replica_metrics():
+    """Whether a read replica is configured, its last measured lag and where reads went."""
+    return database.replica_status()
+
+@router.get("/auth-cache")
+async def get_auth_cache_metrics():
+    """Hit/miss counters and sizes of the token-claims and principal caches."""
+    return {
+        "tokens": {**security.token_cache.stats, "size": len(security.token_cache)},
+        "principals": {**security.principal_cache.stats, "size": len(security.principal_cache)},
+    }
+
+@router.get("/room-index")
+async def get_room_index_metrics():
+    """Hit/miss counters and size of the in-memory room join index."""
+    return {**room_index.entries.stats, "size": len(room_index.entries)}
@@ -1,8 +1,10 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import crud, schemas, security, database, models
+from ..responses import FastJSONResponse, model_response
+from ..roster import roster, participant_payload, JOIN, LEAVE, ROLE, SHARING
 from ..signaling import manager
 
 router = APIRouter(
@@ -10,34 +12,37 @@ router = APIRouter(
     tags=["Sessions"]
 )
 
+def push_roster(session: models.Session, event: str, participant: dict, seq: int):
+    roster.publish(str(session.id), str(session.room_id), event, participant, seq)
+
 @router.post("/{session_id}/participants", response_model=schemas.JoinResponse)
-def join_session(
+async def join_session(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if session.status != 'LIVE':
         raise HTTPException(status_code=400, detail="This session is not live and cannot be joined.")
 
-    participant = crud.add_participant_to_session(db=db, session_id=session_id, user_id=current_user.id)
+    participant, seq = await crud.add_participant_to_session(db=db, session_id=session_id, user_id=current_user.id)
+    push_roster(session, JOIN, participant_payload(participant, current_user), seq)
     return {"message": "Successfully joined the session.", "role": participant.role}
 
 @router.get("/{session_id}", response_model=schemas.SessionDetailOut)
-def get_session_details(
+async def get_session_details(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    participants_db = crud.get_participants_in_session(db, session_id=session_id)
-    active_participants = [p for p in participants_db if p.leave_time is None]
-    
+    active_participants = await crud.get_active_participants(db, session_id=session_id)
+
     participants_out = []
     for p in active_participants:
         # ✅ CRITICAL FIX: Include email/identifier in participant data
@@ -50,75 +55,115 @@ def get_session_details(
     "is_sharing_screen": p.is_sharing_screen
 })
 
-    return {
+    return FastJSONResponse({
         "session_id": session.id, 
         "status": session.status, 
         "participants": participants_out,
         "recording_status": session.recording_status,
         "recording_url": session.recording_url,
         "room_id": session.room_id
+    })
+
+@router.get("/{session_id}/roster")
+async def get_session_roster(
+    session_id: uuid.UUID,
+    since: int | None = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(security.get_current_user)
+):
+    """
+    Resync for the roster-delta feed. With `since`, returns only the deltas
+    after it while they are still in the history; otherwise a full snapshot.
+    Either way, continue applying pushed deltas after the returned `seq`.
+    """
+    session = await crud.get_session_by_id(db, session_id=session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    key = str(session_id)
+    if since is not None:
+        deltas = roster.since(key, since)
+        if deltas is not None:
+            return {"session_id": key, "seq": deltas[-1]["seq"] if deltas else since, "deltas": deltas}
+
+    # The sequence was read with the session, before the snapshot: deltas that race
+    # with the query are replayed by the client, which is harmless because they
+    # carry full state.
+    seq = session.roster_seq
+    participants = await crud.get_active_participants(db, session_id=session_id)
+    return {
+        "session_id": key,
+        "seq": seq,
+        "participants": [participant_payload(p) for p in participants],
     }
 
 @router.delete("/{session_id}/participants/me", status_code=status.HTTP_200_OK)
-def leave_session(
+async def leave_session(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    crud.remove_participant_from_session(db, session_id=session_id, user_id=current_user.id)
+    participant, seq = await crud.remove_participant_from_session(db, session_id=session_id, user_id=current_user.id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
+    if participant and session:
+        push_roster(session, LEAVE, {"user_id": str(current_user.id)}, seq)
     return {"message": "You have left the meeting"}
 
 @router.post("/{session_id}/end", response_model=schemas.Message)
-def end_session_for_all(
+async def end_session_for_all(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
-    host = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    host = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not host or host.role != 'HOST':
         raise HTTPException(status_code=403, detail="Only the host can end the session")
 
-    crud.end_session(db, session=session)
+    await crud.end_session(db, session=session)
     return {"message": "Session has been ended."}
 
 @router.post("/{session_id}/cancel", response_model=schemas.Message)
-def cancel_session(
+async def cancel_session(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    host = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    host = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not host or host.role != 'HOST':
         raise HTTPException(status_code=403, detail="Only the host can cancel the session")
     
     if session.status != 'SCHEDULED':
         raise HTTPException(status_code=400, detail="Only scheduled sessions can be cancelled")
 
-    crud.cancel_session(db, session=session)
+    await crud.cancel_session(db, session=session)
     return {"message": "Session has been cancelled."}
 
 @router.post("/{session_id}/screenshare/start", status_code=status.HTTP_200_OK)
-def start_screenshare(
+async def start_screenshare(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    participant = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    participant = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not participant or participant.leave_time is not None:
         raise HTTPException(status_code=403, detail="User is not an active participant in this session")
 
-    crud.start_screen_share(db, session_id=session_id, user_id=current_user.id)
+    changes = await crud.start_screen_share(db, session_id=session_id, user_id=current_user.id)
 
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if session:
+        # Only one sharer per session: whoever was sharing before gets a delta too
+        for changed, seq in changes:
+            user = current_user if changed.user_id == current_user.id else None
+            push_roster(session, SHARING, participant_payload(changed, user), seq)
         payload = json.dumps({
             "type": "screenshare-started",
             "session_id": str(session_id),
@@ -127,27 +172,27 @@ def start_screenshare(
             "full_name": current_user.full_name
         })
         try:
-            import anyio
-            anyio.from_thread.run(manager.broadcast, payload, str(session.room_id), None)
+            await manager.broadcast(payload, str(session.room_id), None)
         except Exception:
             pass
 
     return {"message": "Screen share started successfully"}
 
 @router.post("/{session_id}/screenshare/stop", status_code=status.HTTP_200_OK)
-def stop_screenshare(
+async def stop_screenshare(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    participant = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    participant = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not participant or not participant.is_sharing_screen:
         raise HTTPException(status_code=403, detail="User is not currently sharing screen")
 
-    crud.stop_screen_share(db, session_id=session_id, user_id=current_user.id)
+    participant, seq = await crud.stop_screen_share(db, session_id=session_id, user_id=current_user.id)
 
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if session:
+        push_roster(session, SHARING, participant_payload(participant, current_user), seq)
         payload = json.dumps({
             "type": "screenshare-stopped",
             "session_id": str(session_id),
@@ -156,74 +201,77 @@ def stop_screenshare(
             "full_name": current_user.full_name
         })
         try:
-            import anyio
-            anyio.from_thread.run(manager.broadcast, payload, str(session.room_id), None)
+            await manager.broadcast(payload, str(session.room_id), None)
         except Exception:
             pass
 
     return {"message": "Screen share stopped successfully"}
 
 @router.post("/{session_id}/recording/start", response_model=schemas.Message)
-def start_session_recording(
+async def start_session_recording(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    host = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    host = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not host or host.role != 'HOST':
         raise HTTPException(status_code=403, detail="Only the host can start a recording")
     
-    crud.start_recording(db, session=session)
+    await crud.start_recording(db, session=session)
     return {"message": "Session recording started"}
 
 @router.post("/{session_id}/recording/stop", response_model=schemas.Message)
-def stop_session_recording(
+async def stop_session_recording(
     session_id: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    session = crud.get_session_by_id(db, session_id=session_id)
+    session = await crud.get_session_by_id(db, session_id=session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    host = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    host = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not host or host.role != 'HOST':
         raise HTTPException(status_code=403, detail="Only the host can stop a recording")
     
     placeholder_url = f"https://recordings.example.com/{session.id}.mp4"
-    crud.stop_recording(db, session=session, url=placeholder_url)
+    await crud.stop_recording(db, session=session, url=placeholder_url)
     return {"message": "Session recording stopped and is available"}
 
 @router.post("/{session_id}/participants/{user_id_to_promote}/promote", response_model=schemas.Message)
-def promote_participant(
+async def promote_participant(
     session_id: uuid.UUID,
     user_id_to_promote: uuid.UUID,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
-    requester_participant = crud.get_participant(db, session_id=session_id, user_id=current_user.id)
+    requester_participant = await crud.get_participant(db, session_id=session_id, user_id=current_user.id)
     if not requester_participant or requester_participant.role != 'HOST':
         raise HTTPException(status_code=403, detail="Only the host can promote participants")
 
-    participant_to_promote = crud.get_participant(db, session_id=session_id, user_id=user_id_to_promote)
+    participant_to_promote = await crud.get_participant(db, session_id=session_id, user_id=user_id_to_promote)
     if not participant_to_promote:
         raise HTTPException(status_code=404, detail="Participant to promote not found in this session")
 
-    crud.update_participant_role(db, participant=participant_to_promote, new_role='MODERATOR')
-    
+    _, seq = await crud.update_participant_role(db, participant=participant_to_promote, new_role='MODERATOR')
+    session = await crud.get_session_by_id(db, session_id=session_id)
+    if session:
+        user = await crud.get_user_by_id(db, user_id=user_id_to_promote)
+        push_roster(session, ROLE, participant_payload(participant_to_promote, user), seq)
+
     return {"message": "Participant has been promoted to Moderator"}
 
 @router.post("/start", response_model=schemas.SessionOut)
-def start_instant_session(
-    db: Session = Depends(database.get_db),
+async def start_instant_session(
+    db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """
     Creates an instant meeting by creating a default room and starting a session in it.
     """
-    session = crud.create_instant_session(db=db, user_id=current_user.id)
-    return session
\ No newline at end of file
+    session = await crud.create_instant_session(db=db, user=current_user)
+    return model_response(schemas.SessionOut, session)
\ No newline at end of file
@@ -1,63 +1,132 @@
-import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, status
-from sqlalchemy.orm import Session
-from .. import crud, security, database
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
+from .. import chat_pipeline, security, wire
 from ..signaling import manager
+from ..wire import Frame
 
 router = APIRouter(
     tags=["Signaling"]
 )
 
+
+class Peer:
+    __slots__ = ("websocket", "room_id", "user")
+
+    def __init__(self, websocket: WebSocket, room_id: str, user):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.user = user
+
+    async def relay(self, frame: Frame, to):
+        # Keep ordering with any ICE candidates this socket still has buffered
+        manager.ice.flush_sender(self.websocket)
+        # Messages addressed with "to" go only to that peer; the rest are room events.
+        if to:
+            await manager.send_to(frame, self.room_id, str(to), self.websocket)
+        else:
+            await manager.broadcast(frame, self.room_id, self.websocket)
+
+
+# --- Message handlers ---
+
+async def handle_chat(peer: Peer, message: dict, frame: Frame):
+    to = message.get("to")
+    session_id = None if to else await chat_pipeline.live_session_for_room(peer.room_id)
+    if session_id is None:
+        # Private messages and rooms without a live session are relayed but not stored
+        chat_payload = Frame(payload={
+            "type": "chat-message",
+            "sender_id": str(peer.user.id),
+            "full_name": peer.user.full_name,
+            "text": message.get("text")
+        })
+        await peer.relay(chat_payload, to)
+        return
+
+    manager.ice.flush_sender(peer.websocket)
+    try:
+        stored, committed = chat_pipeline.publish_chat(
+            session_id, peer.room_id, peer.user, str(message.get("text") or ""),
+            sender=peer.websocket, durable=bool(message.get("durable"))
+        )
+    except chat_pipeline.ChatBufferFull:
+        # Not relayed either, so nobody sees a message that will never be stored
+        manager.send_direct(peer.websocket, Frame(payload={
+            "type": "chat-rejected", "retry_after": chat_pipeline.CHAT_RETRY_AFTER
+        }))
+        return
+    if committed is not None:
+        # Ack from a task so this socket's frame loop is not held up by the flush
+        asyncio.create_task(ack_chat(peer, stored["id"], committed))
+
+async def ack_chat(peer: Peer, message_id, committed):
+    try:
+        await committed
+    except Exception:
+        return
+    manager.send_direct(peer.websocket, Frame(payload={"type": "chat-ack", "id": str(message_id)}))
+
+async def handle_screenshare(peer: Peer, message: dict, frame: Frame):
+    await manager.broadcast(frame, peer.room_id, peer.websocket)
+
+async def handle_ice_candidate(peer: Peer, message: dict, frame: Frame):
+    manager.ice.add(peer.websocket, peer.room_id, message, frame)
+
+async def handle_sdp(peer: Peer, message: dict, frame: Frame):
+    await peer.relay(frame, message.get("to"))
+
+HANDLERS = {
+    "chat-message": handle_chat,
+    "screenshare-started": handle_screenshare,
+    "screenshare-stopped": handle_screenshare,
+    "offer": handle_sdp,
+    "answer": handle_sdp,
+    "ice-candidate": handle_ice_candidate,
+}
+
+
 @router.websocket("/ws/{room_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     room_id: str,
-    token: str = Query(...),
-    db: Session = Depends(database.get_db)
+    token: str = Query(...)
 ):
-    # Authenticate the user and validate the room
-    user = security.get_current_user(token=token, db=db)
-    if not user or not crud.get_room_by_id(db, room_id=room_id):
+    # Authenticate the user and validate the room without blocking the event loop
+    user = await security.authenticate_websocket(token, room_id)
+    if not user:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(websocket, room_id)
+    # JSON unless the client offered the binary subprotocol
+    codec = wire.negotiate(websocket)
+    await manager.connect(websocket, room_id, str(user.id), codec)
+    peer = Peer(websocket, room_id, user)
+
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            message_type = message.get("type")
-
-            # Handle chat messages
-            if message_type == "chat-message":
-                chat_payload = json.dumps({
-                    "type": "chat-message",
-                    "sender_id": str(user.id),
-                    "full_name": user.full_name,
-                    "text": message.get("text")
-                })
-                await manager.broadcast(chat_payload, room_id, websocket)
-            
-            # Handle screenshare start
-            elif message_type == "screenshare-started":
-                await manager.broadcast(data, room_id, websocket)
-            
-            # Handle screenshare stop
-            elif message_type == "screenshare-stopped":
-                await manager.broadcast(data, room_id, websocket)
-            
-            # Handle WebRTC signaling (offer, answer, ICE candidates)
-            elif message_type in ["offer", "answer", "ice-candidate"]:
-                await manager.broadcast(data, room_id, websocket)
+            try:
+                message, frame = await wire.receive(websocket, codec)
+            except wire.ProtocolError as exc:
+                # A bad frame is rejected on its own; the socket stays up
+                manager.send_direct(websocket, Frame(payload={"type": "protocol-error", "detail": str(exc)}))
+                continue
+            manager.touch(websocket)
+            handler = HANDLERS.get(message.get("type"))
+            if handler:
+                await handler(peer, message, frame)
 
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also runs when the reaper evicted us or the frame loop failed,
+        # so the socket never lingers in the manager's indexes.
         manager.disconnect(websocket, room_id)
         # Inform others that a user has left
         await manager.broadcast(
-            json.dumps({
-                "type": "user_left", 
+            Frame(payload={
+                "type": "user_left",
                 "user_id": str(user.id)
-            }), 
-            room_id, 
+            }),
+            room_id,
             websocket
-        )
\ No newline at end of file
+        )
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import crud, schemas, security, database, models
+from ..pagination import decode_cursor, encode_cursor
+from ..responses import FastJSONResponse, orm_rows
 
 router = APIRouter(
     prefix="/api/v1/users",
     tags=["Users"]
 )
 
+CALENDAR_PAGE_DEFAULT = 50
+CALENDAR_PAGE_MAX = 200
+SESSION_STATUSES = ('SCHEDULED', 'LIVE', 'ENDED', 'CANCELLED')
+
+
 # ✅ NEW ENDPOINT - Add this BEFORE the scheduled sessions endpoint
 @router.get("/me")
-def get_current_user_info(
+async def get_current_user_info(
     current_user: models.User = Depends(security.get_current_user)
 ):
     """
@@ -27,12 +37,45 @@ def get_current_user_info(
 
 # Your existing endpoint
 @router.get("/me/sessions/scheduled", response_model=schemas.ScheduledSessionListResponse)
-def get_my_scheduled_sessions(
-    db: Session = Depends(database.get_db),
+async def get_my_scheduled_sessions(
+    db: AsyncSession = Depends(database.get_read_db),
     current_user: models.User = Depends(security.get_current_user)
 ):
     """
     Retrieves a list of all sessions scheduled by the currently authenticated user.
     """
-    sessions = crud.get_scheduled_sessions_for_user(db=db, user_id=current_user.id)
-    return {"data": sessions}
+    sessions = await crud.get_scheduled_sessions_for_user(db=db, user_id=current_user.id)
+    return FastJSONResponse({"data": orm_rows(schemas.ScheduledSessionOut, sessions)})
+
+
+@router.get("/me/sessions", response_model=schemas.SessionCalendarResponse)
+async def get_my_session_calendar(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: List[str] = Query(['SCHEDULED']),
+    cursor: Optional[str] = None,
+    limit: int = Query(CALENDAR_PAGE_DEFAULT, ge=1, le=CALENDAR_PAGE_MAX),
+    db: AsyncSession = Depends(database.get_read_db),
+    current_user: models.User = Depends(security.get_current_user)
+):
+    """
+    Calendar of the sessions the current user hosts, ordered by scheduled start,
+    or by creation time once `status` asks for more than SCHEDULED/CANCELLED.
+    `start`/`end` limit that time to a window (end exclusive) and `status` may
+    be repeated. Pass `next_cursor` back as `cursor` for the next page.
+    """
+    unknown = set(status) - set(SESSION_STATUSES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    sessions, has_more = await crud.get_hosted_sessions_page(
+        db, user_id=current_user.id, statuses=status, limit=limit,
+        start=start, end=end, after=decode_cursor(cursor, datetime, uuid.UUID) if cursor else None,
+    )
+    sort_key = crud.calendar_sort_column(status).key
+    return FastJSONResponse({
+        "data": orm_rows(schemas.ScheduledSessionOut, sessions),
+        "next_cursor": encode_cursor(getattr(sessions[-1], sort_key), sessions[-1].id) if has_more else None,
+    })
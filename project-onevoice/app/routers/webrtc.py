@@ -16,7 +16,7 @@ class WebRTCConfig(BaseModel):
     iceServers: List[IceServer]
 
 @router.get("/config", response_model=WebRTCConfig)
-def get_webrtc_config():
+async def get_webrtc_config():
     """
     Provides the client with the necessary STUN and TURN server configurations.
     """
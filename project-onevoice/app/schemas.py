@@ -76,6 +76,7 @@ class JoinResponse(BaseModel):
 class ParticipantOut(BaseModel):
     user_id: uuid.UUID
     full_name: str
+    email: Optional[str] = None
     role: str
     join_time: datetime
     is_sharing_screen: bool
@@ -89,6 +90,7 @@ class SessionDetailOut(BaseModel):
     participants: List[ParticipantOut]
     recording_status: Optional[str] = None # <-- Add this
     recording_url: Optional[str] = None    # <-- And this
+    room_id: Optional[uuid.UUID] = None
 
     class Config:
         from_attributes = True
@@ -147,6 +149,9 @@ class MessageOut(BaseModel):
 
 class MessageListResponse(BaseModel):
     data: List[MessageOut]
+    # Pass prev_cursor as `before` for older messages, next_cursor as `after` for newer ones
+    prev_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
     
 
 # In app/schemas.py
@@ -155,6 +160,10 @@ class MessageListResponse(BaseModel):
 class ScheduledSessionListResponse(BaseModel):
     data: List[ScheduledSessionOut]
 
+class SessionCalendarResponse(BaseModel):
+    data: List[ScheduledSessionOut]
+    next_cursor: Optional[str] = None
+
 
 
 # In app/schemas.py
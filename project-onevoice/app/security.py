@@ -1,11 +1,15 @@
+import os
+import uuid
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from sqlalchemy.orm import Session
-from . import crud, database, models
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from . import crud, database, models, passwords
+from .cache import TTLCache
+from .signaling import manager
 
 SECRET_KEY = "a-very-secret-and-long-key-for-jwt"
 REFRESH_SECRET_KEY = "another-very-secret-and-long-key-for-refresh"
@@ -13,13 +17,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
+# Blocking versions for scripts; request handlers use passwords.password_hasher
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password_sync(plain_password, hashed_password)
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return passwords.hash_password_sync(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -46,21 +49,116 @@ def verify_refresh_token(token: str):
     
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+# --- Principal cache ---
+# Decoded token claims (by token) and authenticated users (by token subject) are
+# cached for a short TTL, so most requests need neither a JWT decode nor a user
+# query. Cached users are dropped whenever a User row is updated or deleted.
+PRINCIPAL_TTL_SECONDS = int(os.getenv("ONEVOICE_PRINCIPAL_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("ONEVOICE_PRINCIPAL_CACHE_SIZE", "10000"))
+WS_ROOM_TTL_SECONDS = 30
+
+token_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_TTL_SECONDS)
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_TTL_SECONDS)
+ws_room_cache = TTLCache(maxsize=10_000, ttl=WS_ROOM_TTL_SECONDS)
+
+def decode_access_token(token: str) -> dict:
+    """Verified claims of an access token. Raises JWTError if it is invalid or expired."""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Never keep claims past the token's own expiry
+        remaining = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+        if remaining > 0:
+            token_cache.set(token, payload, ttl=min(remaining, PRINCIPAL_TTL_SECONDS))
+    return payload
+
+def token_subject(authorization: str | None) -> str | None:
+    """Subject of a valid `Authorization: Bearer` header, or None; never raises."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except JWTError:
+        return None
+
+async def _load_user(email: str):
+    # Own session, so the cached user is not tied to any request
+    async with database.AsyncSessionLocal() as db:
+        return await crud.get_user_by_email(db, email=email)
+
+async def get_principal(email: str):
+    return await principal_cache.get_or_load(email, lambda: _load_user(email))
+
+def invalidate_principal(*emails: str):
+    for email in emails:
+        principal_cache.pop(email)
+
+def _changed_emails(target) -> list:
+    history = inspect(target).attrs.email.history
+    return [target.email, *history.deleted]
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_flush(mapper, connection, target):
+    emails = _changed_emails(target)
+    invalidate_principal(*emails)
+    # Drop them again once committed, in case a concurrent request re-cached the old row
+    database.defer(object_session(target), "invalidated_principals", *emails)
+
+def _invalidate_on_commit(emails: list):
+    emails = sorted(set(emails))
+    invalidate_principal(*emails)
+    # Every other worker drops its copy too, instead of serving it until the TTL
+    manager.notify("principal-evict", {"emails": emails})
+
+database.on_commit("invalidated_principals", _invalidate_on_commit)
+
+manager.listeners["principal-evict"] = lambda notice: invalidate_principal(*notice["emails"])
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    user = crud.get_user_by_email(db, email=email)
+
+    user = await get_principal(email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+
+# --- WebSocket authentication ---
+# Uses the same principal cache; existing rooms are cached too, so a reconnect
+# storm costs one lookup per user and per room, not per socket.
+
+async def _room_exists(room_id: uuid.UUID):
+    # None rather than False so missing rooms are not cached
+    async with database.AsyncSessionLocal() as db:
+        return True if await crud.get_room_by_id(db, room_id=room_id) else None
+
+async def authenticate_websocket(token: str, room_id: str):
+    """Returns the user for `token` if it may join `room_id`, otherwise None."""
+    try:
+        payload = decode_access_token(token)
+        room_uuid = uuid.UUID(room_id)
+    except (JWTError, ValueError):
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+
+    user = await get_principal(email)
+    if user is None:
+        return None
+    if not await ws_room_cache.get_or_load(room_uuid, lambda: _room_exists(room_uuid)):
+        return None
+    return user
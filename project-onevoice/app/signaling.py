@@ -1,31 +1,216 @@
-from fastapi import WebSocket
+import asyncio
 import logging
+import os
+import time
+
+from fastapi import WebSocket
+
+from . import metrics
+from .backplane import create_backplane
+from .ice_batching import IceBatcher
+from .liveness import Reaper
+from .wire import MSGPACK, Frame
+
+# Every socket gets its own bounded outbound queue drained by a dedicated
+# writer task, so a peer on a bad network can never hold up the rest of the room.
+OUTBOX_SIZE = int(os.getenv("ONEVOICE_WS_OUTBOX_SIZE", "256"))
+SEND_TIMEOUT = float(os.getenv("ONEVOICE_WS_SEND_TIMEOUT", "5"))
+CLOSE_TIMEOUT = 1.0
+
+
+class Connection:
+    """
+    Per-socket record: who it is, where it is, and its outbound queue drained by
+    a dedicated writer task. Slotted so a node with tens of thousands of sockets
+    pays as little as possible per connection.
+    """
+
+    __slots__ = ("websocket", "room_id", "user_id", "codec", "queue", "task", "last_seen", "ping_sent", "latency", "_on_dead")
+
+    def __init__(self, websocket: WebSocket, room_id: str, user_id: str, codec: str | None, on_dead):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.user_id = user_id
+        self.codec = codec
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        self.last_seen = 0.0
+        self.ping_sent = None
+        self.latency = metrics.ws_delivery_seconds.labels()
+        self._on_dead = on_dead
+        self.task = asyncio.create_task(self._writer())
+
+    def put(self, frame: Frame) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _writer(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                try:
+                    data = frame.encode(self.codec)
+                except (TypeError, ValueError):
+                    # e.g. a msgpack bin value has no JSON form; skip it for this peer only
+                    logging.warning(f"Dropped a frame WebSocket {self.websocket.client.host} cannot decode")
+                    continue
+                if self.codec == MSGPACK:
+                    send = self.websocket.send_bytes(data)
+                else:
+                    send = self.websocket.send_text(data)
+                await asyncio.wait_for(send, SEND_TIMEOUT)
+                self.latency.observe(time.perf_counter() - frame.created)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Send failed or timed out: the peer is gone or too slow to keep.
+            self._on_dead(self.websocket, reason=type(exc).__name__)
+
+    def close(self):
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[str, list[WebSocket]] = {}
-        self.all_connections: set[WebSocket] = set() # <-- ADD THIS LINE
-
-    async def connect(self, websocket: WebSocket, room_id: str):
-        await websocket.accept()
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = []
-        self.active_connections[room_id].append(websocket)
-        self.all_connections.add(websocket) # <-- ADD THIS LINE
+    def __init__(self, backplane=None):
+        self.backplane = backplane if backplane is not None else create_backplane()
+        # All lookups are dict/set operations; empty buckets are dropped right away
+        self.connections: dict[WebSocket, Connection] = {}
+        self.active_connections: dict[str, set[Connection]] = {}
+        # (room_id, user_id) -> that user's sockets in the room, for addressed messages
+        self.user_connections: dict[tuple[str, str], set[Connection]] = {}
+        self.stats = {"sent": 0, "evicted": 0}
+        # kind -> callback for frames that other workers published with that kind
+        self.listeners: dict[str, object] = {}
+        self.liveness = Reaper(self)
+        self.ice = IceBatcher(self)
+
+    @property
+    def all_connections(self):
+        return self.connections.keys()
+
+    async def start(self):
+        await self.backplane.start(self._receive_remote)
+        self.liveness.start()
+
+    async def stop(self):
+        self.liveness.stop()
+        await self.backplane.stop()
+
+    async def connect(self, websocket: WebSocket, room_id: str, user_id: str, codec: str | None = None):
+        if websocket in self.connections:
+            return
+        await websocket.accept(subprotocol=codec)
+        conn = Connection(websocket, room_id, user_id, codec, self.evict)
+        self.connections[websocket] = conn
+        self.active_connections.setdefault(room_id, set()).add(conn)
+        self.user_connections.setdefault((room_id, user_id), set()).add(conn)
+        self.liveness.track(conn)
         logging.info(f"WebSocket {websocket.client.host} connected to room {room_id}")
 
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_connections:
-            # Use a loop to safely remove the websocket
-            self.active_connections[room_id] = [conn for conn in self.active_connections[room_id] if conn != websocket]
-        if websocket in self.all_connections:
-            self.all_connections.remove(websocket) # <-- ADD THIS LINE
-        logging.info(f"WebSocket {websocket.client.host} disconnected from room {room_id}")
-
-    async def broadcast(self, message: str, room_id: str, sender: WebSocket):
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                if connection is not sender:
-                    await connection.send_text(message)
-
-manager = ConnectionManager()
\ No newline at end of file
+    def disconnect(self, websocket: WebSocket, room_id: str | None = None):
+        conn = self.connections.pop(websocket, None)
+        if conn is None:
+            return
+        self.ice.flush_sender(websocket)
+        conn.close()
+        self.liveness.untrack(conn)
+        _discard(self.active_connections, conn.room_id, conn)
+        _discard(self.user_connections, (conn.room_id, conn.user_id), conn)
+        logging.info(f"WebSocket {websocket.client.host} disconnected from room {conn.room_id}")
+
+    def evict(self, websocket: WebSocket, reason: str = "slow-consumer"):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        self.disconnect(websocket)
+        self.stats["evicted"] += 1
+        logging.warning(f"Evicted WebSocket {websocket.client.host} from room {conn.room_id}: {reason}")
+        # Closing makes the endpoint's receive loop exit and run its normal cleanup.
+        asyncio.create_task(self._close(websocket))
+
+    def touch(self, websocket: WebSocket):
+        # Called for every inbound frame; keeps the socket off the ping/reap path.
+        conn = self.connections.get(websocket)
+        if conn is not None:
+            self.liveness.seen(conn)
+
+    def send_direct(self, websocket: WebSocket, message: str | Frame):
+        frame = message if isinstance(message, Frame) else Frame(text=message)
+        conn = self.connections.get(websocket)
+        if conn is not None and not conn.put(frame):
+            self.evict(websocket, reason="outbox full")
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+    async def broadcast(self, message: str | Frame, room_id: str, sender: WebSocket):
+        self.publish(message, room_id, sender)
+
+    async def send_to(self, message: str | Frame, room_id: str, user_id: str, sender: WebSocket):
+        # Addressed signaling: only the target user's sockets get the frame.
+        self.publish(message, room_id, sender, to=user_id)
+
+    def publish(self, message: str | Frame, room_id: str, sender: WebSocket | None, to: str | None = None, kind: str | None = None):
+        frame = message if isinstance(message, Frame) else Frame(text=message)
+        self._deliver(frame, room_id, sender, to)
+        if not self.backplane.peers:
+            return
+        # Sockets in this room held by other workers get it through the backplane,
+        # in whichever format the frame is already encoded in.
+        format, data = frame.wire()
+        envelope = {"room": room_id, "format": format, "data": data}
+        if to is not None:
+            envelope["to"] = to
+        if kind is not None:
+            envelope["kind"] = kind
+        self.backplane.publish(envelope)
+
+    def notify(self, kind: str, payload: dict):
+        # Worker-to-worker only: the other workers' `kind` listener gets `payload`, no socket does
+        if self.backplane.peers:
+            self.backplane.publish({"kind": kind, "payload": payload})
+
+    def _receive_remote(self, envelope: dict):
+        if "room" not in envelope:
+            listener = self.listeners.get(envelope.get("kind"))
+            if listener is not None:
+                listener(envelope["payload"])
+            return
+        frame = Frame.from_wire(envelope["format"], envelope["data"])
+        self._deliver(frame, envelope["room"], None, envelope.get("to"))
+        listener = self.listeners.get(envelope.get("kind"))
+        if listener is not None:
+            listener(frame.payload)
+
+    def _deliver(self, frame: Frame, room_id: str, sender: WebSocket | None, to: str | None = None):
+        if to is None:
+            targets = self.active_connections.get(room_id, ())
+        else:
+            targets = self.user_connections.get((room_id, to), ())
+        # Enqueue only; writer tasks do the actual sends concurrently.
+        queued = 0
+        for conn in list(targets):
+            if conn.websocket is sender:
+                continue
+            if conn.put(frame):
+                queued += 1
+            else:
+                self.evict(conn.websocket, reason="outbox full")
+        self.stats["sent"] += queued
+        metrics.broadcast_fanout.labels().observe(queued)
+
+
+def _discard(index: dict, key, conn: Connection):
+    members = index.get(key)
+    if members is not None:
+        members.discard(conn)
+        if not members:
+            del index[key]
+
+manager = ConnectionManager()
@@ -0,0 +1,136 @@
+import json
+import os
+import time
+import zlib
+
+import msgpack
+
+# Signaling wire formats, negotiated with the WebSocket subprotocol header.
+# JSON text frames stay the default; clients that ask for "onevoice.msgpack"
+# get binary frames: one flag byte followed by a msgpack body, deflated when
+# the body is large (SDP offers/answers).
+JSON = "onevoice.json"
+MSGPACK = "onevoice.msgpack"
+DEFLATE_MIN_BYTES = int(os.getenv("ONEVOICE_WS_DEFLATE_MIN_BYTES", "1024"))
+# Largest body an inbound frame may inflate to; bounds decompression bombs
+MAX_FRAME_BYTES = int(os.getenv("ONEVOICE_WS_MAX_FRAME_BYTES", str(1024 * 1024)))
+
+FLAG_PLAIN = 0
+FLAG_DEFLATE = 1
+
+
+class ProtocolError(ValueError):
+    """An inbound frame that is empty, malformed or too large; the socket stays open."""
+
+
+def negotiate(websocket) -> str | None:
+    """Returns the subprotocol to accept, or None for a legacy JSON client."""
+    requested = websocket.scope.get("subprotocols") or []
+    if MSGPACK in requested:
+        return MSGPACK
+    if JSON in requested:
+        return JSON
+    return None
+
+
+def encode_binary(payload: dict) -> bytes:
+    body = msgpack.packb(payload, use_bin_type=True)
+    if len(body) >= DEFLATE_MIN_BYTES:
+        compressed = zlib.compress(body)
+        if len(compressed) < len(body):
+            return bytes((FLAG_DEFLATE,)) + compressed
+    return bytes((FLAG_PLAIN,)) + body
+
+
+def decode_binary(data: bytes) -> dict:
+    if not data:
+        raise ProtocolError("Empty frame")
+    flag, body = data[0], data[1:]
+    if flag == FLAG_DEFLATE:
+        inflater = zlib.decompressobj()
+        try:
+            body = inflater.decompress(body, MAX_FRAME_BYTES)
+        except zlib.error as exc:
+            raise ProtocolError(f"Bad deflate body: {exc}") from None
+        if inflater.unconsumed_tail:
+            raise ProtocolError(f"Frame inflates past {MAX_FRAME_BYTES} bytes")
+        if not inflater.eof:
+            raise ProtocolError("Truncated deflate body")
+    elif flag != FLAG_PLAIN:
+        raise ProtocolError(f"Unknown frame flag {flag}")
+    try:
+        message = msgpack.unpackb(body, raw=False)
+    except Exception as exc:
+        raise ProtocolError(f"Bad msgpack body: {type(exc).__name__}") from None
+    return _message(message)
+
+
+def _message(message) -> dict:
+    if not isinstance(message, dict):
+        raise ProtocolError("Frame is not an object")
+    return message
+
+
+class Frame:
+    """
+    One outbound message, encoded lazily and at most once per wire format no
+    matter how many sockets it fans out to. A frame read off a socket keeps the
+    bytes it arrived as, so relaying it never re-renders it in the other format.
+    """
+
+    __slots__ = ("_payload", "_text", "_binary", "created")
+
+    def __init__(self, payload: dict | None = None, text: str | None = None, binary: bytes | None = None):
+        self._payload = payload
+        self._text = text
+        self._binary = binary
+        # For the delivery-latency metric
+        self.created = time.perf_counter()
+
+    @property
+    def payload(self) -> dict:
+        if self._payload is None:
+            self._payload = json.loads(self._text) if self._text is not None else decode_binary(self._binary)
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(self._payload)
+        return self._text
+
+    def encode(self, codec: str | None) -> str | bytes:
+        if codec == MSGPACK:
+            if self._binary is None:
+                self._binary = encode_binary(self.payload)
+            return self._binary
+        return self.text
+
+    def wire(self) -> tuple[str, str | bytes]:
+        """(format, data) to hand to other workers: whichever encoding already exists."""
+        if self._binary is not None:
+            return MSGPACK, self._binary
+        if self._text is not None:
+            return JSON, self._text
+        return MSGPACK, self.encode(MSGPACK)
+
+    @classmethod
+    def from_wire(cls, format: str, data: str | bytes) -> "Frame":
+        return cls(binary=data) if format == MSGPACK else cls(text=data)
+
+
+async def receive(websocket, codec: str | None) -> tuple[dict, Frame]:
+    """
+    Reads and parses one inbound frame; the Frame reuses the original text or
+    bytes for peers on the same format. Raises ProtocolError for a bad frame.
+    """
+    if codec == MSGPACK:
+        data = await websocket.receive_bytes()
+        message = decode_binary(data)
+        return message, Frame(payload=message, binary=data)
+    data = await websocket.receive_text()
+    try:
+        message = json.loads(data)
+    except ValueError as exc:
+        raise ProtocolError(f"Bad JSON: {exc}") from None
+    return _message(message), Frame(payload=message, text=data)
@@ -0,0 +1,88 @@
+"""
+Fan-out latency in a 50-peer room with a few throttled peers.
+
+Compares the old sequential `await send_text` loop with the queued
+ConnectionManager. Run from project-onevoice/:
+
+    python -m benchmarks.broadcast_fanout
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.signaling import ConnectionManager
+
+
+class FakeClient:
+    host = "bench"
+
+
+class FakeSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.client = FakeClient()
+        self.latencies: list[float] = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - float(message))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+async def sequential_broadcast(sockets, message):
+    for ws in sockets:
+        await ws.send_text(message)
+
+
+async def run(mode: str, peers: int, slow: int, slow_delay: float, messages: int, interval: float):
+    sockets = [FakeSocket(slow_delay if i < slow else 0.0) for i in range(peers)]
+    manager = ConnectionManager()
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, "bench-room", f"user-{i}")
+
+    for _ in range(messages):
+        message = repr(time.perf_counter())
+        if mode == "sequential":
+            await sequential_broadcast(sockets, message)
+        else:
+            await manager.broadcast(message, "bench-room", None)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.2)
+
+    healthy = [lat for ws in sockets[slow:] for lat in ws.latencies]
+    print(
+        f"{mode:>10}: healthy peers p50={percentile(healthy, 50):.2f}ms "
+        f"p99={percentile(healthy, 99):.2f}ms max={max(healthy) * 1000:.2f}ms "
+        f"mean={statistics.mean(healthy) * 1000:.2f}ms evicted={manager.stats['evicted']}"
+    )
+    for ws in list(manager.all_connections):
+        manager.disconnect(ws, "bench-room")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--peers", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=3, help="number of throttled peers")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="seconds per send for throttled peers")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between messages")
+    args = parser.parse_args()
+
+    for mode in ("sequential", "queued"):
+        asyncio.run(run(mode, args.peers, args.slow, args.slow_delay, args.messages, args.interval))
+
+
+if __name__ == "__main__":
+    main()
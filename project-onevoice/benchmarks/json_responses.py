@@ -0,0 +1,100 @@
+"""
+CPU time per response for a --messages long chat history page.
+
+Both routes return the same content that get_chat_history builds from ORM rows
+(dicts of UUIDs, datetimes and strings). "response_model" returns it through
+FastAPI's response_model validation and stdlib json encoding, which is how the
+route used to work; "fast" returns it as a FastJSONResponse (orjson), which is
+how it works now. The ASGI app is called directly, so no HTTP or database time
+is included. Run from project-onevoice/:
+
+    python -m benchmarks.json_responses --messages 1000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+
+from app import schemas
+from app.responses import FastJSONResponse
+
+
+def history(messages: int) -> dict:
+    session_id, user_id = uuid.uuid4(), uuid.uuid4()
+    started = datetime.now(timezone.utc)
+    return {
+        "data": [
+            {
+                "id": uuid.uuid4(),
+                "session_id": session_id,
+                "user_id": user_id,
+                "user_full_name": "Benchmark User",
+                "content": f"message number {i} with a little text in it",
+                "created_at": started + timedelta(milliseconds=i),
+            }
+            for i in range(messages)
+        ],
+        "prev_cursor": "cHJldg==",
+        "next_cursor": "bmV4dA==",
+    }
+
+
+def build_app(content: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=schemas.MessageListResponse)
+    async def via_response_model():
+        return content
+
+    @app.get("/fast", response_model=schemas.MessageListResponse)
+    async def via_fast_response():
+        return FastJSONResponse(content)
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+
+async def run(args):
+    app = build_app(history(args.messages))
+    for path in ("/response_model", "/fast"):
+        for _ in range(args.warmup):
+            await call(app, path)
+        started = time.process_time()
+        for _ in range(args.requests):
+            size = await call(app, path)
+        per_response = (time.process_time() - started) / args.requests
+        print(f"{path.strip('/'):>15}: {per_response * 1000:.2f} ms CPU per response ({size / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
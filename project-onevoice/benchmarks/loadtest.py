@@ -0,0 +1,263 @@
+"""
+WebSocket load test for the /ws/{room_id} signaling endpoint.
+
+By default the FastAPI app is served in this process against a throw-away
+SQLite database, seeded with users and rooms, and the clients run in a
+child process so server memory and event-loop lag can be measured on their
+own. Every room gets an offer/answer exchange and an ICE burst between
+neighbouring peers, then chat at a fixed rate for --duration seconds.
+
+Reports connections per second, fan-out latency percentiles, server memory
+per connection and server event-loop lag. Run from project-onevoice/:
+
+    python -m benchmarks.loadtest --rooms 200 --peers 5
+
+Pass --url ws://host:port together with --database-url to drive a server
+started elsewhere (server-side metrics are then not available). Raise
+`ulimit -n` for large runs.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import tempfile
+import time
+
+ICE_BURST = 10
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "no samples"
+    values = sorted(values)
+    pick = lambda pct: values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+    return f"p50={pick(50):.2f}ms p90={pick(90):.2f}ms p99={pick(99):.2f}ms max={values[-1] * 1000:.2f}ms (n={len(values)})"
+
+
+# --- Fixtures ---
+
+def seed(rooms: int, peers: int):
+    """Creates users and rooms in the configured database and returns [(room_id, [(user_id, token)])]."""
+    from app import database, models, security
+
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        users = [
+            models.User(email=f"load{i}@example.com", full_name=f"Load {i}", password_hash="-")
+            for i in range(rooms * peers)
+        ]
+        db.add_all(users)
+        db.flush()
+        room_rows = [
+            models.Room(name=f"Load room {i}", unique_code=f"load{i:06d}", owner_id=users[i * peers].id)
+            for i in range(rooms)
+        ]
+        db.add_all(room_rows)
+        db.commit()
+        plan = []
+        for i, room in enumerate(room_rows):
+            members = users[i * peers:(i + 1) * peers]
+            plan.append((str(room.id), [(str(u.id), security.create_access_token({"sub": u.email})) for u in members]))
+        return plan
+    finally:
+        db.close()
+
+
+# --- Client side (child process) ---
+
+class Client:
+    def __init__(self, room_id: str, user_id: str, token: str):
+        self.room_id = room_id
+        self.user_id = user_id
+        self.token = token
+        self.ws = None
+        self.reader = None
+
+
+async def client_swarm(url: str, plan, args, pipe):
+    from websockets.asyncio.client import connect
+
+    raise_fd_limit()
+    broadcast_latency: list[float] = []
+    unicast_latency: list[float] = []
+    failures = 0
+
+    clients = [Client(room_id, user_id, token) for room_id, members in plan for user_id, token in members]
+    gate = asyncio.Semaphore(args.connect_concurrency)
+
+    async def reader(client: Client):
+        try:
+            async for raw in client.ws:
+                message = json.loads(raw)
+                kind = message.get("type")
+                now = time.perf_counter()
+                if kind == "ping":
+                    await client.ws.send('{"type": "pong"}')
+                elif kind == "chat-message":
+                    broadcast_latency.append(now - float(message["text"]))
+                elif kind in ("offer", "answer", "ice-candidate"):
+                    unicast_latency.append(now - message["ts"])
+                    if kind == "offer":
+                        await send(client, {"type": "answer", "to": message["from"], "sdp": "v=0"})
+                elif kind == "ice-candidates":
+                    unicast_latency.append(now - message["ts"])
+        except Exception:
+            pass
+
+    async def send(client: Client, payload: dict):
+        payload["from"] = client.user_id
+        payload["ts"] = time.perf_counter()
+        await client.ws.send(json.dumps(payload))
+
+    async def open_one(client: Client):
+        nonlocal failures
+        async with gate:
+            try:
+                client.ws = await connect(f"{url}/ws/{client.room_id}?token={client.token}", max_queue=None)
+                client.reader = asyncio.create_task(reader(client))
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(open_one(c) for c in clients))
+    connect_time = time.perf_counter() - started
+    connected = [c for c in clients if c.ws is not None]
+    pipe.send({"connected": len(connected), "failures": failures, "connect_time": connect_time})
+    pipe.recv()  # server side has sampled memory
+
+    by_room: dict[str, list[Client]] = {}
+    for c in connected:
+        by_room.setdefault(c.room_id, []).append(c)
+
+    async def negotiate(room: list[Client]):
+        # Each peer offers to its neighbour and trickles candidates to it.
+        if len(room) < 2:
+            return
+        for i, c in enumerate(room):
+            peer = room[(i + 1) % len(room)]
+            await send(c, {"type": "offer", "to": peer.user_id, "sdp": "v=0\r\n" * 80})
+            for n in range(ICE_BURST):
+                await send(c, {"type": "ice-candidate", "to": peer.user_id, "candidate": {"candidate": f"candidate:{n}"}})
+
+    async def chatter(c: Client, deadline: float):
+        await asyncio.sleep(random.random() / args.chat_rate)
+        while time.perf_counter() < deadline:
+            await c.ws.send(json.dumps({"type": "chat-message", "text": repr(time.perf_counter())}))
+            await asyncio.sleep(1 / args.chat_rate)
+
+    await asyncio.gather(*(negotiate(room) for room in by_room.values()))
+    deadline = time.perf_counter() + args.duration
+    if args.chat_rate > 0:
+        await asyncio.gather(*(chatter(c, deadline) for c in connected), return_exceptions=True)
+    else:
+        await asyncio.sleep(args.duration)
+    await asyncio.sleep(1.0)
+
+    for c in connected:
+        await c.ws.close()
+        c.reader.cancel()
+    pipe.send({"broadcast": broadcast_latency, "unicast": unicast_latency})
+
+
+def run_clients(url: str, plan, args, pipe):
+    asyncio.run(client_swarm(url, plan, args, pipe))
+
+
+# --- Server side ---
+
+async def lag_probe(samples: list[float], interval: float = 0.01):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def drive(url: str, plan, args, measure_server: bool):
+    loop = asyncio.get_running_loop()
+    parent, child = multiprocessing.get_context("spawn").Pipe()
+    process = multiprocessing.get_context("spawn").Process(target=run_clients, args=(url, plan, args, child))
+    lag: list[float] = []
+    probe = asyncio.create_task(lag_probe(lag)) if measure_server else None
+
+    baseline = rss_bytes()
+    process.start()
+    connected = await loop.run_in_executor(None, parent.recv)
+    memory = rss_bytes() - baseline
+    lag.clear()
+    parent.send("go")
+    results = await loop.run_in_executor(None, parent.recv)
+    process.join()
+    if probe:
+        probe.cancel()
+
+    n = connected["connected"]
+    print(f"connections:     {n} ok, {connected['failures']} failed in {connected['connect_time']:.2f}s "
+          f"({n / connected['connect_time']:.0f} conn/s)")
+    print(f"broadcast (chat) {percentiles(results['broadcast'])}")
+    print(f"unicast (sdp/ice) {percentiles(results['unicast'])}")
+    if measure_server:
+        print(f"server memory:   {memory / max(n, 1) / 1024:.1f} KiB per connection (RSS delta)")
+        print(f"event-loop lag:  {percentiles(lag)}")
+
+
+async def serve_and_drive(plan, args):
+    import uvicorn
+    import main as app_main
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app_main.app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        await drive(f"ws://127.0.0.1:{port}", plan, args, measure_server=True)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--peers", type=int, default=5, help="peers per room")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of chat traffic")
+    parser.add_argument("--chat-rate", type=float, default=0.5, help="chat messages per peer per second")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--url", help="drive an already running server instead, e.g. ws://127.0.0.1:8000")
+    parser.add_argument("--database-url", help="database the server uses (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    if args.database_url:
+        os.environ["ONEVOICE_DATABASE_URL"] = args.database_url
+    elif not args.url:
+        os.environ["ONEVOICE_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+    elif "ONEVOICE_DATABASE_URL" not in os.environ:
+        parser.error("--url needs --database-url (or ONEVOICE_DATABASE_URL) to seed users and rooms")
+
+    plan = seed(args.rooms, args.peers)
+    if args.url:
+        asyncio.run(drive(args.url, plan, args, measure_server=False))
+    else:
+        asyncio.run(serve_and_drive(plan, args))
+
+
+if __name__ == "__main__":
+    main()
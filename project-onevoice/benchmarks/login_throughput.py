@@ -0,0 +1,130 @@
+"""
+Login throughput under a burst, and what it does to the rest of the API.
+
+Starts a uvicorn server per configuration against a temporary SQLite database
+seeded with users, fires --concurrency logins at a time for --duration seconds
+and meanwhile probes a cheap endpoint. Reports successful logins per second,
+503 rejections, login latency and probe latency. Each value of --workers is a
+run: 0 hashes in the request threadpool, N > 0 in N worker processes.
+Run from project-onevoice/:
+
+    python -m benchmarks.login_throughput --workers 0,2 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadtest import percentiles
+
+PASSWORD = "Passw0rd-benchmark"
+
+
+def seed_users(database_url: str, count: int):
+    os.environ["ONEVOICE_DATABASE_URL"] = database_url
+    from app import database, models, security
+
+    database.Base.metadata.create_all(bind=database.engine)
+    password_hash = security.hash_password(PASSWORD)
+    db = database.SessionLocal()
+    try:
+        db.add_all(models.User(email=f"login{i}@example.com", full_name=f"Login {i}", password_hash=password_hash) for i in range(count))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def wait_until_up(url: str, timeout: float = 30.0):
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def burst(url: str, args) -> dict:
+    import httpx
+
+    login_latency, probe_latency = [], []
+    counts = {"ok": 0, "rejected": 0, "failed": 0}
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+
+        async def login(n: int):
+            i = n
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/auth/login", data={"username": f"login{i % args.users}@example.com", "password": PASSWORD})
+                if response.status_code == 200:
+                    counts["ok"] += 1
+                    login_latency.append(time.perf_counter() - started)
+                elif response.status_code == 503:
+                    counts["rejected"] += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                else:
+                    counts["failed"] += 1
+                i += args.concurrency
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/api/v1/webrtc/config")
+                probe_latency.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *(login(n) for n in range(args.concurrency)))
+    return {"login": login_latency, "probe": probe_latency, **counts}
+
+
+def run(workers: int, database_url: str, args):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, ONEVOICE_DATABASE_URL=database_url, ONEVOICE_PASSWORD_WORKERS=str(workers),
+               ONEVOICE_PASSWORD_QUEUE_LIMIT=str(args.queue_limit))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_up(url))
+        result = asyncio.run(burst(url, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    label = "threadpool" if workers == 0 else f"{workers} procs"
+    print(f"{label:>10}: {result['ok'] / args.duration:.1f} logins/s, {result['rejected']} rejected (503), {result['failed']} failed")
+    print(f"{'':>10}  login {percentiles(result['login'])}")
+    print(f"{'':>10}  probe {percentiles(result['probe'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="0,2", help="comma-separated ONEVOICE_PASSWORD_WORKERS values to compare")
+    parser.add_argument("--concurrency", type=int, default=64, help="logins in flight")
+    parser.add_argument("--queue-limit", type=int, default=64, help="ONEVOICE_PASSWORD_QUEUE_LIMIT for the server")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/login.db"
+    seed_users(database_url, args.users)
+    for workers in (int(w) for w in args.workers.split(",")):
+        run(workers, database_url, args)
+
+
+if __name__ == "__main__":
+    main()
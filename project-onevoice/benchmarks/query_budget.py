@@ -0,0 +1,163 @@
+"""
+Statement budget for the endpoints in app/routers/sessions.py.
+
+Seeds a temporary SQLite database with a live session of --participants
+people (half of whom have already left), calls every sessions endpoint once
+and counts the SQL statements each one runs. Exits non-zero if any endpoint
+goes over its budget in BUDGETS or runs any statement more than MAX_REPEATS
+times, so an N+1 that sneaks back in fails the run. Each endpoint is checked
+with app.profiling.assert_query_budget; tests/test_query_budget.py runs the
+same check under pytest so CI fails on a regression.
+Authentication is warmed up first, so cached principal lookups are not
+counted. Run from project-onevoice/:
+
+    python -m benchmarks.query_budget
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+# Statements allowed per request, independent of the number of participants.
+# Each budget is what the endpoint needs today, listed beside it, plus one
+# spare: a single extra lookup is a deliberate change that can bump its budget
+# here, while a per-participant query against the 200-person seed overshoots
+# by far and also trips MAX_REPEATS. Every roster change includes one UPDATE
+# of the session row that reserves its roster seq.
+BUDGETS = {
+    # session, participants joined with users
+    "GET /{session_id}": 3,
+    # session, participants joined with users
+    "GET /{session_id}/roster": 3,
+    # session, roster seq, join upsert
+    "POST /{session_id}/participants": 4,
+    # caller, roster seq, one UPDATE that moves sharing to the caller, session
+    "POST /{session_id}/screenshare/start": 5,
+    # caller, current sharer, roster seq, UPDATE, session
+    "POST /{session_id}/screenshare/stop": 6,
+    # session, caller's role, UPDATE
+    "POST /{session_id}/recording/start": 4,
+    # session, caller's role, UPDATE
+    "POST /{session_id}/recording/stop": 4,
+    # caller, target, roster seq, UPDATE, session, target's user for the broadcast
+    "POST /{session_id}/participants/{user_id}/promote": 7,
+    # caller, roster seq, UPDATE, session
+    "DELETE /{session_id}/participants/me": 5,
+    # session, caller's role, UPDATE
+    "POST /{session_id}/end": 4,
+    # session, caller's role, UPDATE
+    "POST /{scheduled_id}/cancel": 4,
+    # room, session and host INSERTs in one unit of work
+    "POST /start": 4,
+}
+# No statement may run more often than this in one request, however many people joined
+MAX_REPEATS = 2
+
+
+def seed(participants: int):
+    from app import database, models, security
+
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        users = [models.User(email=f"budget{i}@example.com", full_name=f"Budget {i}", password_hash="-") for i in range(participants + 1)]
+        db.add_all(users)
+        db.flush()
+        room = models.Room(name="Budget room", unique_code="budget01", owner_id=users[0].id)
+        db.add(room)
+        db.flush()
+        live = models.Session(room_id=room.id, status="LIVE")
+        scheduled = models.Session(room_id=room.id, status="SCHEDULED")
+        db.add_all([live, scheduled])
+        db.flush()
+        # The last user is not in the session yet; every other odd one has left
+        left = datetime.now(timezone.utc)
+        for i, user in enumerate(users[:-1]):
+            db.add(models.SessionParticipant(
+                session_id=live.id, user_id=user.id,
+                role="HOST" if i == 0 else "PARTICIPANT",
+                leave_time=left if i % 2 and i > 1 else None,
+            ))
+        db.add(models.SessionParticipant(session_id=scheduled.id, user_id=users[0].id, role="HOST"))
+        db.commit()
+        token = lambda user: {"Authorization": f"Bearer {security.create_access_token({'sub': user.email})}"}
+        return {
+            "session_id": live.id,
+            "scheduled_id": scheduled.id,
+            "member_id": users[1].id,
+            "host": token(users[0]),
+            "member": token(users[1]),
+            "guest": token(users[-1]),
+        }
+    finally:
+        db.close()
+
+
+def endpoint_calls(fx: dict) -> list[tuple[str, str, str, str]]:
+    """(budget name, method, url, caller) for every endpoint, in an order where each call succeeds."""
+    base = f"/api/v1/sessions/{fx['session_id']}"
+    return [
+        ("GET /{session_id}", "GET", base, "member"),
+        ("GET /{session_id}/roster", "GET", f"{base}/roster", "member"),
+        ("POST /{session_id}/participants", "POST", f"{base}/participants", "guest"),
+        ("POST /{session_id}/screenshare/start", "POST", f"{base}/screenshare/start", "member"),
+        ("POST /{session_id}/screenshare/stop", "POST", f"{base}/screenshare/stop", "member"),
+        ("POST /{session_id}/recording/start", "POST", f"{base}/recording/start", "host"),
+        ("POST /{session_id}/recording/stop", "POST", f"{base}/recording/stop", "host"),
+        ("POST /{session_id}/participants/{user_id}/promote", "POST", f"{base}/participants/{fx['member_id']}/promote", "host"),
+        ("DELETE /{session_id}/participants/me", "DELETE", f"{base}/participants/me", "guest"),
+        ("POST /{session_id}/end", "POST", f"{base}/end", "host"),
+        ("POST /{scheduled_id}/cancel", "POST", f"/api/v1/sessions/{fx['scheduled_id']}/cancel", "host"),
+        ("POST /start", "POST", "/api/v1/sessions/start", "host"),
+    ]
+
+
+def check_budgets(client, fx: dict) -> dict:
+    """
+    Calls every endpoint once against the seeded fixtures and returns
+    {name: (response, counter, error)}, where error is the AssertionError
+    from assert_query_budget or None.
+    """
+    from app.profiling import assert_query_budget
+
+    for who in ("host", "member", "guest"):
+        client.get("/api/v1/users/me", headers=fx[who])
+    results = {}
+    for name, method, url, who in endpoint_calls(fx):
+        try:
+            response, counter = assert_query_budget(client, method, url, BUDGETS[name], max_repeats=MAX_REPEATS, headers=fx[who])
+            results[name] = (response, counter, None)
+        except AssertionError as exc:
+            results[name] = (None, None, exc)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["ONEVOICE_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/budget.db"
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    fx = seed(args.participants)
+    failed = False
+    with TestClient(app_main.app) as client:
+        results = check_budgets(client, fx)
+    for name, (response, counter, error) in results.items():
+        budget = BUDGETS[name]
+        if error is not None:
+            failed = True
+            print(f"FAIL  {'?':>3}/{budget:<3} ---  {name}\n      {str(error).splitlines()[0]}")
+            continue
+        over = response.status_code >= 400
+        failed |= over
+        print(f"{'FAIL' if over else 'ok':>4}  {counter.count:>3}/{budget:<3} {response.status_code}  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
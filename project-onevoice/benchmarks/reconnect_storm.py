@@ -0,0 +1,114 @@
+"""
+Message latency in live rooms while a burst of sockets re-authenticates.
+
+Existing rooms keep broadcasting while `--reconnects` clients authenticate at
+once, the way they do after a deploy. The "sync" mode is the old inline path
+(JWT decode + two blocking DB lookups on the event loop); "async" is
+security.authenticate_websocket on the async engine. DB latency is simulated
+with a sleep (blocking for "sync", awaited for "async") so no database is
+needed. Run from project-onevoice/:
+
+    python -m benchmarks.reconnect_storm
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+from jose import jwt
+
+from app import security
+from app.signaling import ConnectionManager
+from benchmarks.broadcast_fanout import FakeSocket, percentile
+
+
+def simulated_db(delay: float):
+    async def load_user(email):
+        await asyncio.sleep(delay)
+        return SimpleNamespace(id=uuid.uuid4(), email=email, full_name=email)
+
+    async def room_exists(room_id):
+        await asyncio.sleep(delay)
+        return True
+
+    return load_user, room_exists
+
+
+def sync_auth(delay: float):
+    async def auth(token: str, room_id: str):
+        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        time.sleep(delay)  # user lookup
+        uuid.UUID(room_id)
+        time.sleep(delay)  # room lookup
+        return SimpleNamespace(id=uuid.uuid4(), email=payload["sub"])
+
+    return auth
+
+
+async def live_rooms(manager: ConnectionManager, rooms: list[str], stop: asyncio.Event, interval: float):
+    # Frames are stamped with the time they were due, so a blocked loop shows up as latency.
+    due = time.perf_counter()
+    while not stop.is_set():
+        for room_id in rooms:
+            await manager.broadcast(repr(due), room_id, None)
+        due += interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+
+async def run(mode: str, args):
+    security.principal_cache.clear()
+    security.token_cache.clear()
+    security.ws_room_cache.clear()
+    security._load_user, security._room_exists = simulated_db(args.db_latency)
+
+    manager = ConnectionManager()
+    rooms = [str(uuid.uuid4()) for _ in range(args.rooms)]
+    sockets = []
+    for room_id in rooms:
+        for i in range(args.peers):
+            ws = FakeSocket(0.0)
+            sockets.append(ws)
+            await manager.connect(ws, room_id, f"user-{i}")
+
+    # Reconnecting clients spread over a handful of users and rooms, as in a real storm.
+    tokens = [security.create_access_token({"sub": f"user{i % args.users}@example.com"}) for i in range(args.reconnects)]
+    targets = [rooms[i % len(rooms)] for i in range(args.reconnects)]
+    auth = sync_auth(args.db_latency) if mode == "sync" else security.authenticate_websocket
+
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(live_rooms(manager, rooms, stop, args.interval))
+    await asyncio.sleep(0.1)
+    started = time.perf_counter()
+    await asyncio.gather(*(auth(token, room_id) for token, room_id in zip(tokens, targets)))
+    storm_time = time.perf_counter() - started
+    await asyncio.sleep(0.1)
+    stop.set()
+    await traffic
+
+    latencies = [lat for ws in sockets for lat in ws.latencies]
+    print(
+        f"{mode:>5}: storm took {storm_time * 1000:.0f}ms, live-room delivery "
+        f"p50={percentile(latencies, 50):.2f}ms p99={percentile(latencies, 99):.2f}ms "
+        f"max={max(latencies) * 1000:.2f}ms"
+    )
+    for ws in sockets:
+        manager.disconnect(ws, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--peers", type=int, default=5, help="peers per live room")
+    parser.add_argument("--reconnects", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100, help="distinct users among reconnecting sockets")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per simulated DB round-trip")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between live-room broadcasts")
+    args = parser.parse_args()
+
+    for mode in ("sync", "async"):
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Database round trips per request for the instant-meeting flow
+(POST /api/v1/sessions/start), before and after the unit-of-work change.
+
+"before" replays the old crud sequence: look the user up, then create the room,
+the session and the host row with a commit and a refresh after each step.
+"after" is crud.create_instant_session: one flush that INSERTs all three rows
+with RETURNING, and one commit. Every statement, BEGIN and COMMIT is counted as
+a round trip. --rtt-ms adds that much simulated network latency to each one,
+which is where fewer round trips pay off against a remote Postgres.
+Run from project-onevoice/:
+
+    python -m benchmarks.round_trips --requests 200 --rtt-ms 1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+async def legacy_instant_session(db, user_id):
+    # The pre-unit-of-work crud.create_instant_session, step by step
+    import shortuuid
+    from datetime import datetime, timezone
+    from app import crud, models
+
+    user = await crud.get_user_by_id(db, user_id)
+    room = models.Room(name=f"{user.full_name}'s Instant Meeting", is_private=True, owner_id=user_id, unique_code=shortuuid.random(length=8))
+    db.add(room)
+    await db.commit()
+    await db.refresh(room)
+    session = models.Session(room_id=room.id, status='LIVE', actual_start_time=datetime.now(timezone.utc))
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    db.add(models.SessionParticipant(session_id=session.id, user_id=user_id, role='HOST'))
+    await db.commit()
+    return session
+
+
+async def measure(name, flow, user, args):
+    from sqlalchemy import event
+    from app import database
+    from app.profiling import count_statements
+
+    def delay(*_args):
+        time.sleep(args.rtt_ms / 1000)
+
+    target = database.async_engine.sync_engine
+    hooks = ["before_cursor_execute", "begin", "commit"] if args.rtt_ms else []
+    for hook in hooks:
+        event.listen(target, hook, delay)
+
+    trips, elapsed = [], []
+    try:
+        for _ in range(args.requests):
+            async with database.AsyncSessionLocal() as db:
+                with count_statements() as counter:
+                    started = time.perf_counter()
+                    await flow(db, user)
+                    elapsed.append(time.perf_counter() - started)
+            trips.append(counter.round_trips)
+    finally:
+        for hook in hooks:
+            event.remove(target, hook, delay)
+
+    print(f"{name:>7}: {statistics.mean(trips):.1f} round trips/request, "
+          f"{statistics.mean(elapsed) * 1000:.2f} ms mean, {statistics.median(elapsed) * 1000:.2f} ms p50")
+
+
+async def run(args):
+    from app import crud, database, models
+
+    async with database.AsyncSessionLocal() as db:
+        user = models.User(email="roundtrips@example.com", full_name="Round Trips", password_hash="-")
+        db.add(user)
+        await db.commit()
+
+    await measure("before", lambda db, u: legacy_instant_session(db, u.id), user, args)
+    await measure("after", lambda db, u: crud.create_instant_session(db, user=u), user, args)
+    await database.async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated latency added to every round trip")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["ONEVOICE_DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/round_trips.db"
+    from app import database, models  # noqa: F401 - registers the tables
+
+    database.Base.metadata.create_all(bind=database.engine)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Bytes on the wire and CPU per frame for the signaling wire formats.
+
+Each sample frame is received and re-encoded once for fan-out, the way the
+signaling endpoint handles it: JSON text frames versus msgpack binary frames
+with per-message deflate. Run from project-onevoice/:
+
+    python -m benchmarks.wire_format
+"""
+import argparse
+import json
+import time
+
+from app import wire
+from app.wire import Frame
+
+SDP_LINES = [
+    "v=0", "o=- 4611731400430051336 2 IN IP4 127.0.0.1", "s=-", "t=0 0",
+    "a=group:BUNDLE 0 1", "a=extmap-allow-mixed", "a=msid-semantic: WMS stream",
+    "m=audio 9 UDP/TLS/RTP/SAVPF 111 63 9 0 8 13 110 126", "c=IN IP4 0.0.0.0",
+    "a=rtcp:9 IN IP4 0.0.0.0", "a=ice-ufrag:8hhY", "a=ice-pwd:asd88fgpdd777uzjYhagZg",
+    "a=ice-options:trickle", "a=fingerprint:sha-256 " + ":".join(["7B"] * 32),
+    "a=setup:actpass", "a=mid:0", "a=sendrecv", "a=rtcp-mux",
+    "a=rtpmap:111 opus/48000/2", "a=rtcp-fb:111 transport-cc", "a=fmtp:111 minptime=10;useinbandfec=1",
+] + [f"a=rtpmap:{pt} VP8/90000\r\na=rtcp-fb:{pt} goog-remb\r\na=rtcp-fb:{pt} nack pli" for pt in range(96, 128)]
+
+FRAMES = {
+    "offer": {"type": "offer", "to": "0f8fad5b-d9cb-469f-a165-70867728950e", "sdp": "\r\n".join(SDP_LINES)},
+    "ice-candidate": {
+        "type": "ice-candidate",
+        "to": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "candidate": {
+            "candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 54321 typ srflx raddr 0.0.0.0 rport 0 generation 0",
+            "sdpMid": "0",
+            "sdpMLineIndex": 0,
+        },
+    },
+    "chat-message": {"type": "chat-message", "text": "Can everyone see my screen?"},
+}
+
+
+def per_frame_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'frame':<14} {'format':<16} {'bytes':>7} {'us/frame':>9}")
+    for name, payload in FRAMES.items():
+        text = json.dumps(payload)
+        binary = wire.encode_binary(payload)
+
+        def json_frame():
+            message = json.loads(text)
+            Frame(payload=message, text=text).encode(wire.JSON)
+
+        def msgpack_frame():
+            message = wire.decode_binary(binary)
+            Frame(payload=message).encode(wire.MSGPACK)
+
+        for label, size, fn in (
+            ("json", len(text.encode()), json_frame),
+            ("msgpack+deflate", len(binary), msgpack_frame),
+        ):
+            print(f"{name:<14} {label:<16} {size:>7} {per_frame_us(fn, args.iterations):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,37 @@
-import asyncio
 from fastapi import FastAPI,Request
 from fastapi.responses import JSONResponse
 # from app.routers import authentication, rooms # <-- Import rooms
 # from app.routers import authentication, rooms, sessions 
 # from app.routers import authentication, rooms, sessions, chat # Import the new chat router# Import the new sessions router
-from app.routers import authentication, rooms, sessions, chat, users  ,signaling, webrtc # Import the new users router
+from app.routers import authentication, rooms, sessions, chat, users  ,signaling, webrtc, metrics # Import the new users router
 from fastapi.middleware.cors import CORSMiddleware
 from app.signaling import manager # <-- Import the manager
+from app.chat_pipeline import chat_writer
+from app.database import mark_primary_sticky, prewarm_pool
+from app import security
+from app.passwords import password_hasher
+from app.metrics import MetricsMiddleware, record_exception
+from app.profiling import PROFILE_ENABLED, SQLProfilerMiddleware
 
 app = FastAPI()
 
-# --- Heartbeat Task ---
-async def heartbeat():
-    while True:
-        await asyncio.sleep(20) # Send a ping every 20 seconds
-        for connection in list(manager.all_connections):
-            try:
-                # The ping message can be anything, even empty.
-                await connection.send_text('{"type": "ping"}')
-            except Exception:
-                # If sending fails, the connection is likely dead.
-                # The disconnect logic in the websocket endpoint will handle the cleanup.
-                pass
-
 # --- Lifespan Event Handler ---
 @app.on_event("startup")
 async def startup_event():
-    # Start the heartbeat task when the application starts
-    asyncio.create_task(heartbeat())
+    # Open pooled DB connections up front (ONEVOICE_DB_POOL_PREWARM)
+    await prewarm_pool()
+    # Join the signaling backplane and start the heartbeat/reaper
+    await manager.start()
+    # Start the write-behind buffer that persists chat messages
+    chat_writer.start()
+    # Worker processes for Argon2 hashing
+    password_hasher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await chat_writer.stop()
+    await manager.stop()
+    password_hasher.stop()
 
 
 origins = [
@@ -49,9 +53,30 @@ app.add_middleware(
 
 
 
+# Read-your-writes: after a successful write, the caller's reads go to the primary for a while.
+# Callers are keyed by token subject; API clients rarely keep cookies.
+@app.middleware("http")
+async def replica_stickiness(request: Request, call_next):
+    request.state.principal = security.token_subject(request.headers.get("authorization"))
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        mark_primary_sticky(response, request.state.principal)
+    return response
+
+
+# Opt-in SQL profiler: X-SQL-Profile header and a warning for N+1-looking requests.
+# Added first so it runs inside MetricsMiddleware and shares its per-request tally.
+if PROFILE_ENABLED:
+    app.add_middleware(SQLProfilerMiddleware)
+
+# Per-route latency and DB work, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
-    
+    # Count and log it; the client still only gets a generic 500
+    record_exception(request.scope, exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "An unexpected internal server error occurred."},
@@ -65,6 +90,8 @@ app.include_router(chat.router)
 app.include_router(users.router)
 app.include_router(signaling.router)
 app.include_router(webrtc.router)
+app.include_router(metrics.router)
+app.include_router(metrics.scrape_router)
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the OneVoice API"}
\ No newline at end of file
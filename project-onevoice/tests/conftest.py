@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# The app reads its settings at import, so point it at a throwaway SQLite
+# database and in-process password hashing before any test imports it
+os.environ["ONEVOICE_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("ONEVOICE_PASSWORD_WORKERS", "0")
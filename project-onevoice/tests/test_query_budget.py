@@ -0,0 +1,29 @@
+"""
+Statement budgets for app/routers/sessions.py, from benchmarks/query_budget.py.
+A request over its budget, or one that repeats a statement per participant,
+fails the build.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.query_budget import BUDGETS, check_budgets, seed
+
+PARTICIPANTS = 200
+
+
+@pytest.fixture(scope="module")
+def results():
+    # The endpoints change the session as they go (join, leave, end), so they
+    # run once, in order, and each test reads its own result
+    fx = seed(PARTICIPANTS)
+    with TestClient(main.app) as client:
+        return check_budgets(client, fx)
+
+
+@pytest.mark.parametrize("name", list(BUDGETS))
+def test_statement_budget(results, name):
+    response, counter, error = results[name]
+    if error is not None:
+        raise error
+    assert response.status_code < 400, response.text